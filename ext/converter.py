@@ -1,9 +1,18 @@
+import re
+import struct
 from itertools import compress
 
 from PIL import Image
 
 GRADIENT = " .-:=+*#%@"
 
+# Version 2 header: magic bytes, version, flags, width and height, all little endian
+TEXTURE_MAGIC = b"\0TEX"
+TEXTURE_HEADER = struct.Struct("<4sBBHH")
+TEXTURE_FLAG_RLE = 1
+MAX_RUN = 255
+OPAQUE_RUN = re.compile(rb"[^ ]+")
+
 def get_gradient_color(brightness):
     index = round((len(GRADIENT) - 1) * brightness)
     return GRADIENT[index]
@@ -65,6 +74,46 @@ def image_to_compressed_bytes(image):
 
     return compressed_bytes
 
+def image_to_gradient_bytes(image):
+    return bytes(ord(byte) for byte in iter_compressed_bytes(image_to_bytes(image)))
+
+def encode_rle(pixels):
+    encoded = bytearray()
+    i = 0
+    while i < len(pixels):
+        value = pixels[i]
+        count = 1
+        while i + count < len(pixels) and count < MAX_RUN and pixels[i + count] == value:
+            count += 1
+        encoded.append(count)
+        encoded.append(value)
+        i += count
+    return encoded
+
+def encode_span_table(width, height, pixels):
+    table = bytearray()
+    for y in range(height):
+        spans = [match.span() for match in OPAQUE_RUN.finditer(pixels[y * width:(y + 1) * width])]
+        table += struct.pack("<H", len(spans))
+        for start, end in spans:
+            table += struct.pack("<HH", start, end)
+    return table
+
+def encode_texture_v2(width, height, pixels, rle=True):
+    span_table = encode_span_table(width, height, pixels)
+    # Run length encoding is only used if it makes the texture smaller
+    flags = 0
+    if rle:
+        encoded = encode_rle(pixels)
+        if len(encoded) < len(pixels):
+            pixels = encoded
+            flags |= TEXTURE_FLAG_RLE
+    header = TEXTURE_HEADER.pack(TEXTURE_MAGIC, 2, flags, width, height)
+    return bytearray(header + span_table + pixels)
+
+def image_to_texture_v2(image, rle=True):
+    return encode_texture_v2(image_width(image), image_height(image), image_to_gradient_bytes(image), rle)
+
 def write_bin_file(filepath, bin_data):
     with open(filepath, "wb") as file:
         file.write(bin_data)
@@ -72,8 +121,15 @@ def write_bin_file(filepath, bin_data):
 def main():
     filepath = input("Enter file path to convert: ")
     image = image_load(filepath)
-    compressed = image_to_compressed_bytes(image)
-    compressed.append(0)
+    version = input("Enter texture version (1 or 2): ")
+    if version == "2":
+        compressed = image_to_texture_v2(image, input("Use run length encoding? (y/n): ").lower() == "y")
+    else:
+        if image_width(image) > 255 or image_height(image) > 255:
+            print("Version 1 textures can be at most 255x255, use version 2 instead")
+            return
+        compressed = image_to_compressed_bytes(image)
+        compressed.append(0)
 
     print("Converted successfully!")
     filepath = input("Enter file path to save compressed image: ")
@@ -0,0 +1,54 @@
+import os
+import json
+import argparse
+
+import util
+from render import Sampler, encode_texture, TEXTURE_DIRECTORY, TEXTURE_ATLAS_PATH, ATLAS_MAGIC, ATLAS_HEADER
+
+# Find every texture under a directory, as (name, absolute path) pairs sorted by name
+# Names are relative to the directory and always use forward slashes, so an atlas works on any system
+def find_textures(directory):
+    textures = []
+    for root, _, files in os.walk(directory):
+        for file in files:
+            if file.endswith(".tex"):
+                filepath = os.path.join(root, file)
+                name = os.path.relpath(filepath, directory).replace(os.path.sep, "/")
+                textures.append((name, filepath))
+    return sorted(textures)
+
+# Pack every texture under a directory into one atlas file, and return the number of textures packed
+def build_atlas(directory=TEXTURE_DIRECTORY, output_path=TEXTURE_ATLAS_PATH):
+    directory = util.abspath(directory)
+    output_path = util.abspath(output_path)
+
+    index = {}
+    data = bytearray()
+    for name, filepath in find_textures(directory):
+        # Always load from the file, an existing atlas could be out of date
+        texture = encode_texture(Sampler(filepath, trust_path=True, use_atlas=False))
+        index[name] = (len(data), len(texture))
+        data += texture
+    index_data = json.dumps(index, separators=(",", ":")).encode("utf-8")
+
+    # Write to a temporary file first, so a running game never sees half an atlas
+    temp_path = output_path + ".tmp"
+    with open(temp_path, "wb") as file:
+        file.write(ATLAS_HEADER.pack(ATLAS_MAGIC, len(index_data)))
+        file.write(index_data)
+        file.write(data)
+    os.replace(temp_path, output_path)
+    return len(index)
+
+# Build the atlas, this needs to be run again whenever a texture is changed
+def main():
+    parser = argparse.ArgumentParser(description="Pack every texture into one atlas file")
+    parser.add_argument("--directory", default=TEXTURE_DIRECTORY, help="directory to find textures in")
+    parser.add_argument("--output", default=TEXTURE_ATLAS_PATH, help="path of the atlas file to write")
+    args = parser.parse_args()
+
+    num_textures = build_atlas(args.directory, args.output)
+    print(f"packed {num_textures} textures into {args.output}")
+
+if __name__ == "__main__":
+    main()
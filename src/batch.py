@@ -0,0 +1,221 @@
+# Transforms, clips and projects whole arrays of vertices at once with NumPy
+# The functions in geometry do the same for one point or line at a time, and give exactly the same results
+# NumPy is optional, the renderer falls back to geometry if it is not installed
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from geometry import CLIP_EPSILON
+from mesh import get_cull_view, CULL_RIGHT, CULL_LEFT, CULL_NEAR, CULL_FAR, CULL_MARGIN
+
+# Below this many walls, NumPy takes longer to set up than the walls take to clip one at a time
+BATCH_MIN_WALLS = 64
+
+# Check if NumPy is installed, so the functions here can be used
+def is_available():
+    return np is not None
+
+# Transform an array of 3d points by a 4x4 matrix, giving an array of homogenous points
+# The sums are done in the same order as mat4_multiply, so the results are the same to the last bit
+def transform_points(points, matrix):
+    x, y, z = points[:, 0], points[:, 1], points[:, 2]
+    transformed = np.empty((len(points), 4))
+    for row in range(4):
+        m = matrix[4 * row:4 * row + 4]
+        transformed[:, row] = x * m[0] + y * m[1] + z * m[2] + m[3]
+    return transformed
+
+# Compute the boundary coordinates of an array of homogenous points for clipping, like point_boundary_coordinates_clip
+def boundary_coordinates(points):
+    x, y, z, w = points[:, 0], points[:, 1], points[:, 2], points[:, 3]
+    bounds = np.stack((w + x, w - x, w + y, w - y, w + z, w - z), axis=1)
+    tolerance = CLIP_EPSILON * np.abs(w)[:, None]
+    return np.where(np.abs(bounds) <= tolerance, 0.0, bounds)
+
+# Clip an array of lines to the camera view volume with Liang-Barsky, like line_clip does for one line
+# Returns which lines can be seen, and the new start and end points, which are only meaningful for visible lines
+def clip_lines(a, b):
+    a_bounds = boundary_coordinates(a)
+    b_bounds = boundary_coordinates(b)
+    a_outside = a_bounds < 0
+    b_outside = b_bounds < 0
+
+    # Lines with both points outside of the same plane cannot be seen
+    visible = ~(a_outside & b_outside).any(axis=1)
+
+    # The distance across each line that it crosses each plane, only used for planes that one point is outside
+    # Lines that cannot be seen can divide by zero, but are never used
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t_hit = a_bounds / (a_bounds - b_bounds)
+        t_in = np.where(a_outside & ~b_outside, t_hit, 0).max(axis=1)
+        t_out = np.where(b_outside, t_hit, 1).min(axis=1)
+        visible &= t_in < t_out
+
+        a_out = np.where(a_outside.any(axis=1)[:, None], a + (b - a) * t_in[:, None], a)
+        b_out = np.where(b_outside.any(axis=1)[:, None], a + (b - a) * t_out[:, None], b)
+    return visible, a_out, b_out
+
+# Convert an array of homogenous points to screen points, like point_clip_to_screen
+# Returns the x and y coordinates as integers, and the depths
+def clip_to_screen(points, screen_width, screen_height):
+    w = points[:, 3]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        divided = np.where((w == 0)[:, None], 0, points[:, :3] / w[:, None])
+    scaled = (divided + 1) / 2
+    x = np.rint(scaled[:, 0] * screen_width).astype(np.int64)
+    y = np.rint(scaled[:, 1] * screen_height).astype(np.int64)
+    return x, y, scaled[:, 2]
+
+# Convert clipped lines to screen lines, as lists of ((x, y, z), (x, y, z)) for the lines that are visible
+def lines_to_screen(visible, a, b, screen_width, screen_height):
+    a_x, a_y, a_z = clip_to_screen(a[visible], screen_width, screen_height)
+    b_x, b_y, b_z = clip_to_screen(b[visible], screen_width, screen_height)
+    return list(zip(zip(a_x.tolist(), a_y.tolist(), a_z.tolist()), zip(b_x.tolist(), b_y.tolist(), b_z.tolist())))
+
+# Find the walls of a wall mesh that could be seen by a camera all at once, the same as WallMesh.cull
+def cull_walls(wall_mesh, camera, back_faces=False):
+    cull_x, cull_y, forward_x, forward_y, view_scale, near_clip, far_clip = get_cull_view(camera)
+    position = camera.get_position()
+    points = np.frombuffer(wall_mesh.get_points(), dtype=np.float64).reshape(-1, 2)
+    normals = np.frombuffer(wall_mesh.get_normals(), dtype=np.float64).reshape(-1, 2)
+
+    # Which planes of the view each bound is outside of
+    d_x = points[:, 0] - cull_x
+    d_y = points[:, 1] - cull_y
+    forward = d_x * forward_x + d_y * forward_y
+    side = (d_y * forward_x - d_x * forward_y) * view_scale
+    outside = np.where(side - forward > CULL_MARGIN, CULL_RIGHT, 0) | \
+              np.where(-side - forward > CULL_MARGIN, CULL_LEFT, 0) | \
+              np.where(forward < near_clip - CULL_MARGIN, CULL_NEAR, 0) | \
+              np.where(forward > far_clip + CULL_MARGIN, CULL_FAR, 0)
+    # Wall i joins bound i - 1 to bound i
+    visible = (np.roll(outside, 1) & outside) == 0
+
+    if back_faces and contains(points, position):
+        facing = (position[0] - points[:, 0]) * normals[:, 0] + (position[1] - points[:, 1]) * normals[:, 1]
+        visible &= facing >= -CULL_MARGIN
+    indices = np.flatnonzero(visible)
+    return indices, len(points) - len(indices)
+
+# Check if a point is inside a polygon, given as an array of points, the same as WallMesh.contains
+def contains(points, point):
+    a = np.roll(points, 1, axis=0)
+    b = points
+    crosses = (a[:, 1] > point[1]) != (b[:, 1] > point[1])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        edge_x = a[:, 0] + (point[1] - a[:, 1]) * (b[:, 0] - a[:, 0]) / (b[:, 1] - a[:, 1])
+    return np.count_nonzero(crosses & (point[0] < edge_x)) % 2 == 1
+
+# Transform and clip the walls of a wall mesh at once, giving the same list as WallMesh.clip
+# Only the walls given are used, or every wall if none are given
+def clip_walls(wall_mesh, matrix, screen_width, screen_height, wall_indices=None):
+    vertices = np.frombuffer(wall_mesh.get_vertices(), dtype=np.float64).reshape(-1, 3)
+    # Each bound has a bottom, middle and top vertex, and wall i joins bound i - 1 to bound i
+    transformed = transform_points(vertices, matrix).reshape(-1, 3, 4)
+    start = np.roll(transformed, 1, axis=0)
+    if wall_indices is not None:
+        wall_indices = np.asarray(wall_indices, dtype=np.int64)
+        start = start[wall_indices]
+        transformed = transformed[wall_indices]
+    else:
+        wall_indices = np.arange(len(transformed))
+
+    mid_visible, mid_a, mid_b = clip_lines(start[:, 1], transformed[:, 1])
+    # Top and bottom lines are only needed for walls whose middle line can be seen
+    shown = np.flatnonzero(mid_visible)
+    indices = wall_indices[shown]
+    start = start[shown]
+    transformed = transformed[shown]
+    top_visible, top_a, top_b = clip_lines(start[:, 2], transformed[:, 2])
+    bottom_visible, bottom_a, bottom_b = clip_lines(start[:, 0], transformed[:, 0])
+
+    mid_lines = lines_to_screen(mid_visible, mid_a, mid_b, screen_width, screen_height)
+    top_lines = iter(lines_to_screen(top_visible, top_a, top_b, screen_width, screen_height))
+    bottom_lines = iter(lines_to_screen(bottom_visible, bottom_a, bottom_b, screen_width, screen_height))
+    mid_z = zip(start[:, 1, 2].tolist(), transformed[:, 1, 2].tolist())
+
+    walls = []
+    for i, mid_line, z, top_shown, bottom_shown in zip(indices.tolist(), mid_lines, mid_z,
+                                                        top_visible.tolist(), bottom_visible.tolist()):
+        top_line = next(top_lines) if top_shown else None
+        bottom_line = next(bottom_lines) if bottom_shown else None
+        walls.append((i, mid_line, z, top_line, bottom_line))
+    return walls
+
+# Find the gradients of arrays of lines, like line_gradient, as arrays of mx, my and c
+def line_gradients(a_x, a_y, b_x, b_y):
+    d_x = a_x - b_x
+    d_y = a_y - b_y
+    steep = np.fabs(d_x) <= np.fabs(d_y)
+    point = (d_x == 0) & (d_y == 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        gradient = np.where(steep, d_x / d_y, d_y / d_x)
+    intercept = np.where(steep, a_x - gradient * a_y, a_y - gradient * a_x)
+    mx = np.where(point, 1.0, np.where(steep, 1.0, -gradient))
+    my = np.where(point, 1.0, np.where(steep, -gradient, 1.0))
+    c = np.where(point, 0.0, -intercept)
+    return mx, my, c
+
+# Solve arrays of lines for y at arrays of x, like line_solve_y, giving 0 where a line has no y
+def solve_y(x, mx, my, c):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(my == 0, 0.0, (-mx * x - c) / my)
+
+# Get the gradients of the screen lines of some walls, and which of the lines could be seen
+def wall_line_gradients(lines):
+    shown = np.array([line is not None for line in lines], dtype=bool)
+    points = np.array([line if line is not None else ((0, 0, 0), (1, 1, 0)) for line in lines],
+                      dtype=np.float64).reshape(-1, 2, 3)
+    return shown, line_gradients(points[:, 0, 0], points[:, 0, 1], points[:, 1, 0], points[:, 1, 1])
+
+# Find which wall is drawn in each column of the screen at once, giving the same table as mesh.solve_columns
+# Every column of every wall is solved together, then the tallest wall in each column is found with one sort
+def solve_columns(walls, screen_width, screen_height, z_buffer):
+    columns = [(0, 0, -1)] * screen_width
+    if len(walls) == 0:
+        return columns
+
+    wall_indices = np.array([wall[0] for wall in walls], dtype=np.int64)
+    mid_x = np.array([(wall[1][0][0], wall[1][1][0]) for wall in walls], dtype=np.float64)
+    mid_z = np.array([wall[2] for wall in walls], dtype=np.float64)
+    mid_g = line_gradients(mid_x[:, 0], mid_z[:, 0], mid_x[:, 1], mid_z[:, 1])
+    top_shown, top_g = wall_line_gradients([wall[3] for wall in walls])
+    bottom_shown, bottom_g = wall_line_gradients([wall[4] for wall in walls])
+
+    # One entry for every column of every wall, in the same order the walls would be drawn
+    min_x = mid_x.min(axis=1).astype(np.int64)
+    counts = mid_x.max(axis=1).astype(np.int64) - min_x + 1
+    order = np.repeat(np.arange(len(walls)), counts)
+    x = min_x[order] + np.arange(len(order)) - np.repeat(np.cumsum(counts) - counts, counts)
+
+    y1 = np.where(top_shown[order], solve_y(x, *(g[order] for g in top_g)), screen_height + 1)
+    y2 = np.where(bottom_shown[order], solve_y(x, *(g[order] for g in bottom_g)), 0)
+    delta_y = np.fabs(y1 - y2)
+    z = solve_y(x, *(g[order] for g in mid_g))
+
+    # A wall is only drawn in a column if it has some height, the tallest wall wins and the first wall breaks ties
+    candidates = np.flatnonzero(delta_y > 0)
+    if len(candidates) == 0:
+        return columns
+    ranked = candidates[np.lexsort((order[candidates], -delta_y[candidates], x[candidates]))]
+    _, first = np.unique(x[ranked], return_index=True)
+    nearest = ranked[first]
+
+    for column_x, depth in zip(x[nearest].tolist(), z[nearest].tolist()):
+        z_buffer[column_x] = depth
+
+    # The top and bottom are found again for each column, where a flat line is treated differently
+    nearest = nearest[x[nearest] < screen_width]
+    column_x = x[nearest]
+    wall = order[nearest]
+    top_mx, top_my, top_c = (g[wall] for g in top_g)
+    bottom_mx, bottom_my, bottom_c = (g[wall] for g in bottom_g)
+    top_y = np.where(top_shown[wall] & (top_my != 0), np.rint(solve_y(column_x, top_mx, top_my, top_c)),
+                     screen_height + 1).astype(np.int64)
+    bottom_y = np.where(bottom_shown[wall] & (bottom_my != 0),
+                        np.rint(solve_y(column_x, bottom_mx, bottom_my, bottom_c)), 0).astype(np.int64)
+    for column, top, bottom, i in zip(column_x.tolist(), top_y.tolist(), bottom_y.tolist(),
+                                      wall_indices[wall].tolist()):
+        columns[column] = (top, bottom, i)
+    return columns
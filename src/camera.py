@@ -0,0 +1,55 @@
+from geometry import X, Y, mat4_compose, mat4_projection, mat4_rotation_z, mat4_translation, \
+    point_transform_3d_matrix
+
+# The camera used to draw in 3D, keeps the translation, rotation and projection composed into one matrix
+# The matrix is only built again when something it depends on changes
+class Camera:
+    def __init__(self):
+        self.__position = None
+        self.__rotation = None
+        self.__projection = None
+        self.__matrix = None
+
+    # Move the camera to a position on the level, facing a direction
+    def set_view(self, position, rotation):
+        position = position[X], position[Y]
+        if position != self.__position or rotation != self.__rotation:
+            self.__position = position
+            self.__rotation = rotation
+            self.__matrix = None
+
+    # Set how the camera projects onto the screen
+    def set_projection(self, fov, aspect_ratio, near_clip, far_clip):
+        projection = fov, aspect_ratio, near_clip, far_clip
+        if projection != self.__projection:
+            self.__projection = projection
+            self.__matrix = None
+
+    # Get the position of the camera on the level
+    def get_position(self):
+        return self.__position
+
+    # Get the direction the camera faces
+    def get_rotation(self):
+        return self.__rotation
+
+    # Get the fov, aspect ratio, near clip and far clip of the camera
+    def get_projection(self):
+        return self.__projection
+
+    # Build the matrix again next time they are needed, even if nothing seems to have changed
+    def invalidate(self):
+        self.__matrix = None
+
+    # Get the matrix that does the translation, rotation and projection of a point at once
+    def get_matrix(self):
+        if self.__matrix is None:
+            translation_matrix = mat4_translation(-self.__position[X], 0, -self.__position[Y])
+            rotation_matrix = mat4_rotation_z(self.__rotation)
+            projection_matrix = mat4_projection(*self.__projection)
+            self.__matrix = mat4_compose(projection_matrix, mat4_compose(rotation_matrix, translation_matrix))
+        return self.__matrix
+
+    # Transform a 3d point into clip space, with one multiply by the composed matrix
+    def transform(self, point):
+        return point_transform_3d_matrix(point, self.get_matrix())
@@ -0,0 +1,148 @@
+import time
+from multiprocessing import Process, Pipe
+from multiprocessing.connection import wait
+
+from util import Message
+from view import GameView
+from physics import send_message, recv_message, physics_thread
+
+# When nothing has changed, the longest to wait for the physics thread before checking for input again
+IDLE_TIMEOUT = 1 / 60
+
+# Paces frames to a frame rate, keeping track of when the next frame is due and how many were late
+# Frames are due a fixed interval apart, so the frame rate does not drift if each one is drawn slightly late
+class FrameScheduler:
+    # Initialise with the most frames per second to draw, 0 means frames are drawn as fast as possible
+    def __init__(self, fps_cap=0):
+        self.__interval = 0
+        self.__deadline = time.perf_counter()
+        self.__frames = 0
+        self.__missed = 0
+        self.set_fps_cap(fps_cap)
+
+    # Set the most frames per second to draw
+    def set_fps_cap(self, fps_cap):
+        if fps_cap > 0:
+            self.__interval = 1 / fps_cap
+        else:
+            self.__interval = 0
+
+    # Get how long until the next frame is due, in seconds
+    def get_wait(self, now):
+        return max(0, self.__deadline - now)
+
+    # Called when a frame is started, if no frames were drawn for a while then the next ones are due from now
+    def begin_frame(self, now):
+        if now - self.__deadline > self.__interval:
+            self.__deadline = now
+
+    # Called when a frame is finished, a frame that finishes after the next is due has missed its deadline
+    def end_frame(self, now):
+        self.__frames += 1
+        self.__deadline += self.__interval
+        if now > self.__deadline:
+            if self.__interval > 0:
+                self.__missed += 1
+            self.__deadline = now
+
+    # Get the number of frames drawn
+    def get_frames(self):
+        return self.__frames
+
+    # Get the number of frames that took longer than the interval between frames
+    def get_missed(self):
+        return self.__missed
+
+# The game client, runs the physics thread and draws whatever it sends back using the game view
+# It works with any output that has the same loop and events as a window, so is combined with one to make the game
+class GameClient(GameView):
+    # Initialise the game client, the output should be initialised first
+    # If only rendering on change, frames are only drawn when something visible has changed
+    def __init__(self, render_on_change=True):
+        GameView.__init__(self)
+        self.__render_on_change = render_on_change
+        self.__scheduler = FrameScheduler(self.get_setting("FPS_CAP"))
+
+        self.__prev_time = time.perf_counter()
+        self.__cur_time  = time.perf_counter()
+
+        # Allows for communication between the client and the physics thread
+        input_pipe, self.__output_pipe = Pipe(duplex=False)
+        self.__input_pipe, output_pipe = Pipe(duplex=False)
+        self.__physics = Process(target=physics_thread, args=(input_pipe, output_pipe))
+
+    # On begin callback, when window loads
+    def on_begin(self):
+        self.__physics.start()
+
+    # On end callback, when the output is closed
+    def on_end(self):
+        send_message(self.__output_pipe, Message.EXIT, 0)
+        self.__physics.join()
+
+    # The main loop, is called every frame
+    def main(self):
+        # See if physics thread has given any updates
+        while self.__input_pipe.poll():
+            try:
+                message, data = recv_message(self.__input_pipe)
+                if message == Message.EXIT:
+                    self.end()
+                else:
+                    self.handle_message(message, data)
+            except EOFError:
+                # Only happens when X is pressed, and physics thread closes before main
+                return
+
+        if self.__render_on_change and not self.is_frame_dirty():
+            # Nothing to draw, so sleep until the physics thread sends something, or it is time to check for input
+            wait([self.__input_pipe], IDLE_TIMEOUT)
+            return
+
+        # If the next frame is not due yet, sleep until it is, or until the physics thread sends something
+        now = time.perf_counter()
+        frame_wait = self.__scheduler.get_wait(now)
+        if frame_wait > 0:
+            wait([self.__input_pipe], min(frame_wait, IDLE_TIMEOUT))
+            return
+        self.__scheduler.begin_frame(now)
+
+        self.__cur_time = now
+        fps = 1 / (self.__cur_time - self.__prev_time)
+        self.__prev_time = self.__cur_time
+
+        alpha = self.get_alpha(self.__cur_time)
+        self.draw_frame(alpha, fps)
+        self.swap_buffers()
+        self.__scheduler.end_frame(time.perf_counter())
+
+    # Update settings, the frame rate cap is used by the client rather than the view
+    def update_settings(self, key, value):
+        GameView.update_settings(self, key, value)
+        if key == "FPS_CAP":
+            self.__scheduler.set_fps_cap(value)
+
+    # Add how well frames are keeping to the frame rate cap to the stats display
+    def get_stats_lines(self):
+        return GameView.get_stats_lines(self) + [
+            f"FRAMES: {self.__scheduler.get_frames()} DRAWN {self.__scheduler.get_missed()} LATE"]
+
+    # Called every time a key is pressed
+    def key_press_event(self, event):
+        send_message(self.__output_pipe, Message.KEY_PRESS, event.keysym)
+
+    # Called every time a key is released
+    def key_release_event(self, event):
+        send_message(self.__output_pipe, Message.KEY_RELEASE, event.keysym)
+
+    # Called when input begins/ input box is no longer empty
+    def input_begin_event(self):
+        send_message(self.__output_pipe, Message.INPUT_BEGIN, 0)
+
+    # Called when input ends / input box becomes empty
+    def input_end_event(self):
+        send_message(self.__output_pipe, Message.INPUT_END, 0)
+
+    # Called when the enter key is pressed
+    def return_event(self):
+        send_message(self.__output_pipe, Message.COMMAND, self.prev_input)
@@ -1,5 +1,11 @@
 from src.gui import *
 from tkinter import font
+from collections import deque
+
+from render import Renderer
+
+# Number of lines appended to the output box that are kept, older lines are dropped
+SCROLLBACK_LINES = 1000
 
 # Change the TkFixedFont size
 def tk_fixed_font_size(font_size):
@@ -20,16 +26,22 @@ def tk_get_fixed_font_height():
 class Console(Window):
     MONO   = 0
     COLOUR = 1
+    ROWS   = 2
+    # Font width and height for each font size that has been used, asking tkinter for them is slow
+    _font_metrics = {}
     # Create the console with a width, height, and x, y position
     # The font size and colours can also be set.
     def __init__(self, width, height, x, y, font_size, bg="#000000", fg="#FFFFFF", mode=MONO):
         super().__init__(x, y, width, height, "Console window")
         tk_fixed_font_size(font_size)
+        self.__font_size = font_size
 
         if mode == Console.COLOUR:
             self.__stdout = ColourText(self, bg=bg, fg=fg, font_name="TkFixedFont")
             self.__stdout.tag_configure("test", foreground="red")
             self.__stdout.tag_add("test", "1.1", "1.10")
+        elif mode == Console.ROWS:
+            self.__stdout = RowText(self, bg=bg, fg=fg, font_name="TkFixedFont")
         else:
             self.__stdout = Text(self, bg=bg, fg=fg, font_name="TkFixedFont")
 
@@ -40,15 +52,17 @@ class Console(Window):
         self.__inputting = False
         self.prev_input = ""
 
+        # Lines appended to the output box, only the last ones that fit are given to the widget
+        self.__scrollback = deque(maxlen=SCROLLBACK_LINES)
+        self.__scrollback_synced = True
+
         self.add_key_release_listener(self.__key_release_listener)
-        self.add_configure_listener(self.__configure_listener)
 
         self.__stdin.focus()
         self.__stdin.pack(side=tk.BOTTOM, fill=tk.X)
         self.__stdout.pack(fill=tk.BOTH, expand=tk.TRUE)
 
-        self._font_width = tk_get_fixed_font_width()
-        self._font_height = tk_get_fixed_font_height()
+        self.__update_font_metrics()
 
     # Called every time a key is released
     def __key_release_listener(self, event):
@@ -64,9 +78,11 @@ class Console(Window):
                 self.input_end_event()
                 self.__inputting = False
 
-    def __configure_listener(self, _):
-        self._font_width = tk_get_fixed_font_width()
-        self._font_height = tk_get_fixed_font_height()
+    # Set the font width and height for the current font size, only measuring the font the first time a size is used
+    def __update_font_metrics(self):
+        if self.__font_size not in Console._font_metrics:
+            Console._font_metrics[self.__font_size] = (tk_get_fixed_font_width(), tk_get_fixed_font_height())
+        self._font_width, self._font_height = Console._font_metrics[self.__font_size]
 
     # Called when an input begins
     def input_begin_event(self):
@@ -88,14 +104,45 @@ class Console(Window):
         pass
 
     # Append data to the output box
+    # Only the lines that fit in the output box are given to the widget, so this takes the same time however much
+    # has been appended before
     def stdout_a(self, output):
-        display = self.__stdout.get_display()
-        display += output + "\n"
-        self.__stdout.set_display(display)
+        if not self.__scrollback_synced:
+            # The output box was overwritten, so start again from what it is showing
+            self.__scrollback.clear()
+            self.__scrollback.extend(self.__stdout.get_display().splitlines())
+            self.__scrollback_synced = True
+        lines = output.split("\n")
+        self.__scrollback.extend(lines)
+
+        num_lines = max(1, self.get_height_chars())
+        if hasattr(self.__stdout, "append_rows"):
+            self.__stdout.append_rows(lines[-num_lines:], num_lines)
+        else:
+            start = max(0, len(self.__scrollback) - num_lines)
+            visible = [self.__scrollback[i] for i in range(start, len(self.__scrollback))]
+            self.__stdout.set_display("\n".join(visible) + "\n")
+
+    # Get the lines that have been appended to the output box, including those that no longer fit in it
+    def get_scrollback(self):
+        return list(self.__scrollback)
 
     # Overwrite data already in the output box
     def stdout_w(self, output):
         self.__stdout.set_display(output)
+        self.__scrollback_synced = False
+
+    # Overwrite only some rows of the output box, given as (row index, row) pairs
+    # Only available in ROWS mode
+    def stdout_rows(self, num_rows, rows):
+        if hasattr(self.__stdout, "set_rows"):
+            self.__stdout.set_num_rows(num_rows)
+            self.__stdout.set_rows(rows)
+            self.__scrollback_synced = False
+
+    # Get the mode of the output box: mono, colour or rows
+    def get_mode(self):
+        return self.__mode
 
     def set_colour(self, x, y, colour):
         if hasattr(self.__stdout, "set_colour"):
@@ -129,6 +176,48 @@ class Console(Window):
 
     # Set the font size of the console
     def set_font_size(self, font_size):
-        self._font_width = tk_get_fixed_font_width()
-        self._font_height = tk_get_fixed_font_height()
+        if font_size == self.__font_size:
+            return
         tk_fixed_font_size(font_size)
+        self.__font_size = font_size
+        self.__update_font_metrics()
+        self.font_size_event()
+
+    # Overrideable method, called when the font size changes
+    def font_size_event(self):
+        pass
+
+# Console GUI class, a console window that displays everything drawn by the renderer
+# Console is listed first so that its window methods are used over the renderer's placeholders
+class ConsoleGUI(Console, Renderer):
+    # Initialise with a width, height and an x, y coordinate
+    # By default only the rows that change between frames are sent to the window
+    def __init__(self, width, height, x, y, mode=Console.ROWS):
+        Console.__init__(self, width, height, x, y, 5, fg="#22BB00", mode=mode)
+        Renderer.__init__(self, self.get_width_chars(), self.get_height_chars())
+
+    # Called when the window changes size, meaning the buffer needs to be resized
+    def configure_event(self, event):
+        self.__resize_buffer()
+
+    # Called when the font size changes, meaning the window fits a different number of characters
+    def font_size_event(self):
+        self.__resize_buffer()
+
+    # Resize the buffer to fit the window, if the number of characters has changed
+    def __resize_buffer(self):
+        width_chars, height_chars = self.get_width_chars(), self.get_height_chars()
+        if (width_chars, height_chars) != (self._buffer.get_width(), self._buffer.get_height()):
+            self._buffer.resize(width_chars, height_chars)
+
+    # 'Swap buffers' actually just prints the buffer to the screen, and clears the buffer for writing
+    # The name is borrowed from 3D graphics APIs such as OpenGL and DirectX
+    def swap_buffers(self):
+        if self.get_mode() == Console.ROWS:
+            # If nothing has changed, tkinter does not need to be told anything
+            rows = self._buffer.changed_rows()
+            if len(rows) > 0:
+                self.stdout_rows(self._buffer.get_height(), rows)
+        else:
+            self.stdout_w(self._buffer.as_string())
+        self._buffer.swap()
@@ -1,6 +1,7 @@
 import json
 import math
 import os
+import textwrap
 
 import util
 from render import Sampler, sampler_array
@@ -304,6 +305,10 @@ class DisplayEntity:
     def get_sampler(self):
         return self.__samplers[self.__sampler_index]
 
+    # Get the sampler index of the display entity
+    def get_sampler_index(self):
+        return self.__sampler_index
+
     # Set the sampler index of the display entity
     def set_sampler_index(self, sampler_index):
         self.__sampler_index = sampler_index
@@ -336,6 +341,10 @@ class DisplayEntity:
         self.__prev_rotation = self.__curr_rotation
         self.__curr_rotation = self.__next_rotation
 
+    # Check if the display entity moved in the last update, so is somewhere different depending on alpha
+    def is_moving(self):
+        return self.__prev_position != self.__curr_position or self.__prev_rotation != self.__curr_rotation
+
 # A subclass of entity that represents the player
 class Player(Entity):
     ROTATION_SPEED = 0.025
@@ -715,6 +724,7 @@ class TextBox:
         self.__max_height = max_height
         self.__id = TextBox._id_counter
         self.__visible = visible
+        self.__wrapped = None
         TextBox._id_counter += 1
 
     # Get the text box's title
@@ -725,6 +735,13 @@ class TextBox:
     def get_content(self):
         return self.__content
 
+    # Get the content wrapped to a width, as a list of lines
+    # The content never changes, so the lines are kept until a different width is asked for
+    def wrap_content(self, width):
+        if self.__wrapped is None or self.__wrapped[0] != width:
+            self.__wrapped = width, textwrap.wrap(self.__content, width)
+        return self.__wrapped[1]
+
     # Get the max width of the text box
     def get_max_width(self):
         return self.__max_width
@@ -784,6 +801,9 @@ class Menu:
         self.__items = []
         self.__visible = visible
         self.__formatting = {}
+        self.__wrapped_names = None
+        self.__wrapped_descriptions = {}
+        self.__description_width = None
 
     # Get the menu's title
     def get_title(self):
@@ -792,10 +812,47 @@ class Menu:
     # Add an item, which is a name and a description
     def add_item(self, item_name, item_description=None):
         self.__items.append((item_name, item_description))
+        self.__clear_wrapped()
 
     # Remove an item by index
     def remove_item(self, item_index):
         self.__items.pop(item_index)
+        self.__clear_wrapped()
+
+    # Forget any wrapped text, as the items have changed
+    def __clear_wrapped(self):
+        self.__wrapped_names = None
+        self.__wrapped_descriptions.clear()
+
+    # Get every item name wrapped to a width, as a list of lines for each item
+    # Also gets the line each item ends on, with a blank line between each item
+    # The names are only kept for the last width asked for, so resizing the window does not keep adding to them
+    def wrap_item_names(self, width):
+        if self.__wrapped_names is None or self.__wrapped_names[0] != width:
+            wrapped_names = []
+            needed_lines = []
+            line_n = 0
+            for i in range(len(self.__items)):
+                lines = textwrap.wrap(self.__items[i][0], width)
+                line_n += len(lines)
+                wrapped_names.append(lines)
+                needed_lines.append(line_n)
+                if i != len(self.__items) - 1:
+                    line_n += 1
+            self.__wrapped_names = width, wrapped_names, needed_lines
+        return self.__wrapped_names[1:]
+
+    # Get an item's description wrapped to a width, as a list of lines
+    # Descriptions are only kept for the last width asked for, like the names
+    def wrap_item_description(self, index, width):
+        if width != self.__description_width:
+            self.__description_width = width
+            self.__wrapped_descriptions.clear()
+        wrapped = self.__wrapped_descriptions.get(index)
+        if wrapped is None:
+            wrapped = textwrap.wrap(self.get_item_description(index), width)
+            self.__wrapped_descriptions[index] = wrapped
+        return wrapped
 
     # Get an item's name by index
     def get_item_name(self, index):
@@ -846,6 +903,7 @@ class Menu:
     # Set the formatting of the menu, will replace any '{}' in the menu with the formatting
     def set_formatting(self, index, formatting):
         self.__formatting[index] = formatting
+        self.__clear_wrapped()
 
 # A menu interface class, stores only the necessary data to operate the menu from the physics thread
 class MenuInterface:
@@ -19,6 +19,9 @@ VISIBLE   = 0
 INVISIBLE = 1
 CLIP      = 2
 
+# How close to a clip plane a point has to be, relative to its w, to count as on the plane
+CLIP_EPSILON = 1e-9
+
 # Find the gradient of a line ax + by + c = 0 from two points
 def line_gradient(a, b):
     d_x = a[X] - b[X]
@@ -43,22 +46,89 @@ def line_bbox(a, b):
     max_y = max(a[Y], b[Y])
     return min_x, min_y, max_x, max_y
 
+# Divide two integers, rounding up
+def ceil_divide(p, q):
+    return -((-p) // q)
+
+# Find the runs of a line along its major axis, as (major start, major end, minor) tuples
+# Anything outside the screen is clipped before any runs are found, and runs are found using only integers
+# The one exception is a point exactly halfway between two cells, which is given to whichever cell
+# round(solve_minor(major)) gives. The float line equation rounds some of those ties up and some down, so this is the
+# only way to draw lines exactly as solving the line equation at every point would, whichever way round they go
+def line_major_runs(major_0, minor_0, d_major, d_minor, screen_major, screen_minor, solve_minor):
+    # Always step forwards along the major axis
+    if d_major < 0:
+        major_0 += d_major
+        minor_0 += d_minor
+        d_major = -d_major
+        d_minor = -d_minor
+
+    clip_start = max(0, major_0)
+    clip_end = min(screen_major - 1, major_0 + d_major)
+    if clip_start > clip_end:
+        return
+
+    if d_minor == 0:
+        if 0 <= minor_0 < screen_minor:
+            yield clip_start, clip_end, minor_0
+        return
+
+    step = 1 if d_minor > 0 else -1
+    d_minor = abs(d_minor)
+
+    # The minor coordinate is minor_0 + step * k, where k is the rounded distance along the minor axis
+    def rounded_k(t):
+        k, remainder = divmod(2 * t * d_minor + d_major, 2 * d_major)
+        if remainder == 0:
+            k = step * (round(solve_minor(major_0 + t)) - minor_0)
+        return k
+
+    # The first distance along the major axis that rounds to k rather than k - 1
+    def run_start(k):
+        start, remainder = divmod((2 * k - 1) * d_major, 2 * d_minor)
+        if remainder != 0 or rounded_k(start) != k:
+            start += 1
+        return start
+
+    # Find which values of k are on the screen, and within the clipped part of the major axis
+    if step > 0:
+        k_min = max(0, -minor_0)
+        k_max = min(d_minor, screen_minor - 1 - minor_0)
+    else:
+        k_min = max(0, minor_0 - (screen_minor - 1))
+        k_max = min(d_minor, minor_0)
+    k_min = max(k_min, rounded_k(clip_start - major_0))
+    k_max = min(k_max, rounded_k(clip_end - major_0))
+
+    for k in range(k_min, k_max + 1):
+        start = max(major_0 + run_start(k), clip_start)
+        end = min(major_0 + run_start(k + 1) - 1, clip_end)
+        if start <= end:
+            yield start, end, minor_0 + step * k
+
+# Iterate over the runs in a line between two integer points, clipped to the screen
+# Each run is a horizontal or vertical stretch of points, given as (x1, y1, x2, y2)
+# The float line equation is only found if a point falls exactly halfway between two cells
+def line_iter_runs(a, b, screen_x, screen_y):
+    d_x = b[X] - a[X]
+    d_y = b[Y] - a[Y]
+    if abs(d_x) > abs(d_y):
+        def solve_y(x):
+            return line_solve_y(x, *line_gradient(a, b))
+        for x1, x2, y in line_major_runs(a[X], a[Y], d_x, d_y, screen_x, screen_y, solve_y):
+            yield x1, y, x2, y
+    else:
+        def solve_x(y):
+            return line_solve_x(y, *line_gradient(a, b))
+        for y1, y2, x in line_major_runs(a[Y], a[X], d_y, d_x, screen_y, screen_x, solve_x):
+            yield x, y1, x, y2
+
 # Iterate over points at integer intervals in a line
 def line_iter_points(a, b, screen_x, screen_y):
-    gx, gy, c = line_gradient(a, b)
-    min_x, min_y, max_x, max_y = line_bbox(a, b)
-
-    min_x = max(0, min_x)
-    min_y = max(0, min_y)
-    max_x = min(screen_x - 1, max_x)
-    max_y = min(screen_y - 1, max_y)
-
-    if gy == 1:
-        for x in range(min_x, max_x + 1):
-            yield x, round(line_solve_y(x, gx, gy, c))
-    elif gx == 1:
-        for y in range(min_y, max_y + 1):
-            yield round(line_solve_x(y, gx, gy, c)), y
+    for x1, y1, x2, y2 in line_iter_runs(a, b, screen_x, screen_y):
+        for y in range(y1, y2 + 1):
+            for x in range(x1, x2 + 1):
+                yield x, y
 
 # Given a y coordinate, find the x coordinate
 def line_solve_x(y, mx, my, c):
@@ -148,6 +218,32 @@ def triangle_uv(a, b, c, uv_a, uv_b, uv_c, p):
     v = uv_a[V] * uf + uv_b[V] * vf + uv_c[V] * wf
     return u, v
 
+# Find the first and last x coordinates on a row that are inside a triangle, between min_x and max_x
+# These are exactly the points that triangle_contains accepts, but found per row instead of per point
+# Returns None if no part of the row is inside the triangle
+def triangle_row_span(a, b, c, y, min_x, max_x):
+    for p, q in ((a, b), (b, c), (c, a)):
+        # The signed area of p, q and a point on the row is k * x + m, which must not be negative
+        k = p[Y] - q[Y]
+        m = (q[X] - p[X]) * (y - p[Y]) + (q[Y] - p[Y]) * p[X]
+        if k > 0:
+            min_x = max(min_x, -(m // k))
+        elif k < 0:
+            max_x = min(max_x, (-m) // k)
+        elif m < 0:
+            return None
+        if min_x > max_x:
+            return None
+    return min_x, max_x
+
+# Get the uv coordinates at point a of a triangle, and how much they change for each step in x and in y
+# uv coordinates are linear across a triangle, so they can be stepped instead of calculated for every point
+def triangle_uv_gradient(a, b, c, uv_a, uv_b, uv_c):
+    uv_o = triangle_uv(a, b, c, uv_a, uv_b, uv_c, a)
+    uv_x = triangle_uv(a, b, c, uv_a, uv_b, uv_c, (a[X] + 1, a[Y]))
+    uv_y = triangle_uv(a, b, c, uv_a, uv_b, uv_c, (a[X], a[Y] + 1))
+    return uv_o, (uv_x[U] - uv_o[U], uv_x[V] - uv_o[V]), (uv_y[U] - uv_o[U], uv_y[V] - uv_o[V])
+
 # Rotate a point around a centre point
 def point_rotate_centre(p, c, angle):
     cx = p[X] - c[X]
@@ -302,6 +398,14 @@ def mat4_multiply(matrix, point):
         point[X] * matrix[12] + point[Y] * matrix[13] + point[Z] * matrix[14] + point[W] * matrix[15]
     )
 
+# Multiply two 4x4 matrices, giving one matrix that transforms a point by b and then by a
+# Points transformed by the result can round differently to transforming them by b and then by a
+def mat4_compose(a, b):
+    return tuple(
+        a[row] * b[column] + a[row + 1] * b[column + 4] + a[row + 2] * b[column + 8] + a[row + 3] * b[column + 12]
+        for row in range(0, 16, 4) for column in range(4)
+    )
+
 # Create a 4x4 rotation matrix in the Z axis
 def mat4_rotation_z(angle):
     sin = math.sin(angle)
@@ -362,6 +466,7 @@ def p_scale_point(point):
     pz = p_scalar(point[Z])
     return px, py, pz
 
+# Transform a 3d point by translation, rotation then projection, one matrix at a time
 def point_transform_3d(point, translation_matrix, rotation_matrix, projection_matrix):
     vertex = point[X], point[Y], point[Z], 1
     vertex = mat4_multiply(translation_matrix, vertex)
@@ -369,6 +474,10 @@ def point_transform_3d(point, translation_matrix, rotation_matrix, projection_ma
     vertex = mat4_multiply(projection_matrix, vertex)
     return vertex
 
+# Transform a 3d point by a single matrix, such as the translation, rotation and projection composed together
+def point_transform_3d_matrix(point, matrix):
+    return mat4_multiply(matrix, (point[X], point[Y], point[Z], 1))
+
 # Scale a point from ranges(0, 1) to ranges(0, screen_size)
 def point_to_screen(point, screen_width, screen_height):
     return round(point[X] * screen_width), round(point[Y] * screen_height), point[Z]
@@ -384,6 +493,13 @@ def point_boundary_coordinates(point):
         point[W] - point[Z]
     )
 
+# Compute the boundary coordinates of a point for clipping, where a point that is only off a plane by rounding error
+# is put exactly on it
+# Otherwise a point on a plane could end up either side of it depending on how its matrix was multiplied out
+def point_boundary_coordinates_clip(point):
+    tolerance = CLIP_EPSILON * math.fabs(point[W])
+    return tuple(0.0 if -tolerance <= bound <= tolerance else bound for bound in point_boundary_coordinates(point))
+
 # Compute the region code of a point, where 0=out, 1=in, for +x,-x,+y,-y,+z,-z, as a 6bit binary number
 def point_region_code(bounds):
     code = 0
@@ -398,8 +514,8 @@ def parametric_s(a, b, t):
 
 # Compute the new coordinates of two points making up a line, which are cropped to the camera view volume
 def line_clip(a, b):
-    a_bounds = point_boundary_coordinates(a)
-    b_bounds = point_boundary_coordinates(b)
+    a_bounds = point_boundary_coordinates_clip(a)
+    b_bounds = point_boundary_coordinates_clip(b)
 
     a_region = point_region_code(a_bounds)
     b_region = point_region_code(b_bounds)
@@ -418,7 +534,7 @@ def line_clip(a, b):
         elif a_bounds[i] < 0:
             t_hit = a_bounds[i] / (a_bounds[i] - b_bounds[i])
             t_in = max(t_hit, t_in)
-        if t_in > t_out: # If left over area is less than 0, not visible
+        if t_in >= t_out: # If there is no left over area, the line at most touches the view volume: not visible
             return None
 
     # Update points where necessary
@@ -1,6 +1,10 @@
 import tkinter
 import tkinter as tk
 
+# Time in milliseconds that the window has to stay the same size before a resize is handled
+# Dragging the window creates an event for every size it passes through
+RESIZE_DELAY = 100
+
 # A subclass of Tkinter window, trying to make as many layers of abstraction from tkinter as possible
 class Window(tk.Tk):
     # An initialise method for the window, runs a lot of tkinter methods
@@ -18,6 +22,8 @@ class Window(tk.Tk):
         self.__running = False
         self._width = width
         self._height = height
+        self.__resize_event = None
+        self.__resize_job = None
 
     # Add a key press listener
     def add_key_press_listener(self, listener):
@@ -44,7 +50,24 @@ class Window(tk.Tk):
             listener(event)
 
     # Private method to handle tkinter configure
+    # The binding is inherited by every widget in the window, so only events for the window itself are used
+    # Handling the resize is put off until the size stops changing
     def __configure_event(self, event):
+        if event.widget is not self:
+            return
+        self.__resize_event = event
+        if self.__resize_job is not None:
+            self.after_cancel(self.__resize_job)
+        self.__resize_job = self.after(RESIZE_DELAY, self.__resize)
+
+    # Private method to handle the last configure event once the size has settled
+    def __resize(self):
+        event = self.__resize_event
+        self.__resize_event = None
+        self.__resize_job = None
+        # Moving the window also creates configure events
+        if (event.width, event.height) == (self._width, self._height):
+            return
         self._width = event.width
         self._height = event.height
         self.configure_event(event)
@@ -169,3 +192,62 @@ class ColourText(Displayable, tk.Text):
 
     def set_colour(self, x, y, colour):
         self.__colours.append((x, y, colour))
+
+# Wrapper class for tkinter text, that updates the display one row at a time
+# Only rows that have changed are given to tkinter, so it does not have to lay out the whole display again
+class RowText(Displayable, tk.Text):
+    def __init__(self, root, bg="black", fg="white", font_name="TkFixedFont"):
+        tk.Text.__init__(self, root, bg=bg, fg=fg, font=font_name, borderwidth=0, highlightthickness=0,
+                         padx=0, pady=0, wrap=tk.NONE, takefocus=0, cursor="")
+        self.__rows = []
+        self.configure(state=tk.DISABLED)
+
+    # Change the number of rows being displayed, only needed when the size of the display changes
+    def set_num_rows(self, num_rows):
+        if num_rows == len(self.__rows):
+            return
+        self.__rows = self.__rows[:num_rows] + [""] * (num_rows - len(self.__rows))
+        self.configure(state=tk.NORMAL)
+        self.delete("1.0", tk.END)
+        self.insert("1.0", "\n".join(self.__rows))
+        self.configure(state=tk.DISABLED)
+
+    # Replace rows of the display, given as (row index, row) pairs
+    def set_rows(self, rows):
+        self.configure(state=tk.NORMAL)
+        for y, row in rows:
+            self.__rows[y] = row
+            # tkinter text lines start at 1
+            self.delete(f"{y + 1}.0", f"{y + 1}.end")
+            self.insert(f"{y + 1}.0", row)
+        self.configure(state=tk.DISABLED)
+
+    # Add rows to the end of the display, removing rows from the start so that there are at most max_rows
+    # The rows already displayed are moved up by tkinter, rather than being given to it again
+    def append_rows(self, rows, max_rows):
+        self.configure(state=tk.NORMAL)
+        for row in rows:
+            while len(self.__rows) >= max_rows:
+                self.__rows.pop(0)
+                self.delete("1.0", "2.0")
+            if len(self.__rows) == 0:
+                self.insert("1.0", row)
+            else:
+                self.insert("end-1c", "\n" + row)
+            self.__rows.append(row)
+        self.configure(state=tk.DISABLED)
+
+    # Set the whole display, but still only update rows that are different
+    def set_display(self, display):
+        rows = display.split("\n")
+        if rows[-1] == "":
+            rows.pop()
+        self.set_num_rows(len(rows))
+        changed = [(y, rows[y]) for y in range(len(rows)) if rows[y] != self.__rows[y]]
+        if len(changed) > 0:
+            self.set_rows(changed)
+
+    def get_display(self):
+        if len(self.__rows) == 0:
+            return ""
+        return "\n".join(self.__rows) + "\n"
@@ -0,0 +1,169 @@
+import os
+import sys
+import math
+import json
+import time
+import argparse
+import tempfile
+
+from util import Message
+from render import Renderer, Sampler
+from view import GameView
+from game import DisplayEntity, Entity, Player, Level, level_array
+from physics import GameState, ENGINES
+
+# Size of a character in pixels, roughly that of the fixed font in the console window
+HEADLESS_FONT_WIDTH  = 7
+HEADLESS_FONT_HEIGHT = 14
+
+# The camera is not a real entity, so give it an id that the physics thread would never use
+CAMERA_ID = -1
+
+# Size of the synthetic levels, the walls zigzag between the two radii all the way around
+SYNTHETIC_INNER_RADIUS = 40
+SYNTHETIC_OUTER_RADIUS = 46
+
+# A renderer with no window, draws into a buffer in memory that is a fixed number of characters in size
+class HeadlessGUI(Renderer):
+    # Initialise with a width and height in characters, and optionally the size of a character in pixels
+    def __init__(self, width_chars, height_chars, font_width=HEADLESS_FONT_WIDTH, font_height=HEADLESS_FONT_HEIGHT):
+        Renderer.__init__(self, width_chars, height_chars)
+        self.__width_chars = width_chars
+        self.__height_chars = height_chars
+        self.__font_width = font_width
+        self.__font_height = font_height
+        self.__frame = ""
+
+    # Get the width, in characters, of the output
+    def get_width_chars(self):
+        return self.__width_chars
+
+    # Get the height, in characters, of the output
+    def get_height_chars(self):
+        return self.__height_chars
+
+    # Get the width, in pixels, that a console window would need to fit this many characters
+    def get_width(self):
+        return (self.__width_chars + 1) * self.__font_width
+
+    # Get the height, in pixels, that a console window would need to fit this many characters
+    def get_height(self):
+        return self.__height_chars * self.__font_height
+
+    # Keep the finished frame as a string, and clear the buffer for writing
+    def swap_buffers(self):
+        self.__frame = self._buffer.as_string()
+        self._buffer.swap()
+
+    # Get the last frame that was drawn
+    def get_frame(self):
+        return self.__frame
+
+# The game view with no window, anything the physics thread would send can be given to handle_message directly
+class HeadlessGame(GameView, HeadlessGUI):
+    # Initialise with a width and height in characters
+    def __init__(self, width_chars, height_chars):
+        HeadlessGUI.__init__(self, width_chars, height_chars)
+        GameView.__init__(self)
+
+    # Draw a single frame, and return it as a string
+    def render(self, alpha=1, fps=0):
+        self.draw_frame(alpha, fps)
+        self.swap_buffers()
+        return self.get_frame()
+
+# Create a headless game showing a level, with a camera at the spawnpoint
+def create_level_view(level, width_chars, height_chars):
+    game = HeadlessGame(width_chars, height_chars)
+    camera = DisplayEntity(level.get_spawnpoint(), 0, 1, Player.SAMPLERS, CAMERA_ID, DisplayEntity.SPRITE, False, "")
+    game.handle_message(Message.ENTITY_CREATED, camera)
+    game.handle_message(Message.FOCUS_ID, CAMERA_ID)
+
+    # Spawn the level's entities the same way the physics thread would
+    for entity_type, position in level.iter_entities():
+        entity = Entity.from_string(entity_type, position, 0)
+        entity_cls = entity.__class__
+        display_entity = DisplayEntity(entity.get_position(), entity.get_rotation(), entity.get_hitbox_radius(),
+                                       entity_cls.SAMPLERS, entity.get_id(), entity_cls.DISPLAY_TYPE, True, str(entity))
+        game.handle_message(Message.ENTITY_CREATED, display_entity)
+
+    game.handle_message(Message.LEVEL_CHANGED, level)
+    game.handle_message(Message.GAME_STATE_CHANGED, GameState.GAME)
+    return game, camera
+
+# Create a level with any number of walls, for seeing how the renderer copes with bigger levels than the game has
+# It is one room shaped like a star, with the spawnpoint in the middle
+def create_synthetic_level(num_walls):
+    bounds = []
+    for i in range(num_walls):
+        angle = 2 * math.pi * i / num_walls
+        radius = SYNTHETIC_OUTER_RADIUS if i % 2 else SYNTHETIC_INNER_RADIUS
+        bounds.append([radius * math.cos(angle), radius * math.sin(angle)])
+
+    # Levels can only be loaded from a file
+    file = tempfile.NamedTemporaryFile("w", suffix=".json", delete=False)
+    try:
+        with file:
+            json.dump({"BOUNDS": bounds, "OPTIONS": {"SPAWNPOINT": [[0, 0]]}}, file)
+        return Level(file.name, trust_path=True)
+    finally:
+        os.remove(file.name)
+
+# Render a level while turning the camera all the way around, and return the time taken
+# The walls are drawn with the given engine, or whichever the settings default to
+def benchmark_level(level, width_chars, height_chars, num_frames, engine=None):
+    game, camera = create_level_view(level, width_chars, height_chars)
+    if engine is not None:
+        game.handle_message(Message.UPDATE_SETTING, ("RENDER_ENGINE", engine))
+    start = time.perf_counter()
+    for i in range(num_frames):
+        camera.set_rotation(2 * math.pi * i / num_frames)
+        camera.update()
+        game.render()
+    return time.perf_counter() - start, game.get_frame()
+
+# Run the renderer as fast as it can go on every level, and print the frame rate for each
+# Every engine is run on each level if asked, so they can be compared
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the renderer without a window")
+    parser.add_argument("--width", type=int, default=160, help="width of the output in characters")
+    parser.add_argument("--height", type=int, default=60, help="height of the output in characters")
+    parser.add_argument("--frames", type=int, default=200, help="number of frames to render for each level")
+    parser.add_argument("--show", action="store_true", help="print the last frame of each level")
+    parser.add_argument("--engine", choices=ENGINES + ("ALL",), type=str.upper,
+                        help="engine to draw the walls with, or ALL to compare every engine")
+    parser.add_argument("--synthetic", type=int, nargs="*", default=[], metavar="WALLS",
+                        help="also benchmark synthetic levels with these numbers of walls")
+    args = parser.parse_args()
+
+    if args.engine == "ALL":
+        engines = ENGINES
+    else:
+        engines = (args.engine,)
+
+    levels = [(f"level {index}", level) for index, level in enumerate(level_array("res/levels"))]
+    for num_walls in args.synthetic:
+        levels.append((f"synthetic {num_walls}", create_synthetic_level(num_walls)))
+
+    for name, level in levels:
+        for engine in engines:
+            elapsed, frame = benchmark_level(level, args.width, args.height, args.frames, engine)
+            if args.show:
+                print(frame)
+            if engine is not None:
+                name_shown = f"{name} ({engine.lower()})"
+            else:
+                name_shown = name
+            print(f"{name_shown}: {args.frames} frames in {elapsed:.3f}s, "
+                  f"{args.frames / elapsed:.1f} FPS, {elapsed / args.frames * 1000:.2f} ms/frame")
+
+    # Textures are loaded when the game is imported and when each view is created
+    sampler_count, sampler_time = Sampler.get_load_stats()
+    print(f"loaded {sampler_count} textures in {sampler_time * 1000:.2f} ms")
+
+    # Make sure the renderer really did run without tkinter
+    if "tkinter" in sys.modules:
+        print("warning: tkinter was imported")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+import math
+from array import array
+
+from geometry import X, Y, Z, mat4_multiply, vector_perpendicular, vector_multiply, line_clip, line_clip_to_screen, \
+    line_gradient, line_solve_y
+
+# Number of vertices stored for each bound of a level, at the bottom, middle and top of the wall
+VERTICES_PER_BOUND = 3
+
+# Planes of the view that a point can be clearly outside of when culling
+CULL_RIGHT = 1
+CULL_LEFT  = 2
+CULL_NEAR  = 4
+CULL_FAR   = 8
+
+# How far outside of a plane a point has to be to be culled, so rounding never culls a wall that clipping would keep
+CULL_MARGIN = 1e-6
+
+# Get the signed area of a polygon, which is positive if its points go anticlockwise
+def polygon_signed_area(points):
+    area = 0
+    for i in range(len(points)):
+        a = points[i - 1]
+        b = points[i]
+        area += a[X] * b[Y] - b[X] * a[Y]
+    return area / 2
+
+# Get what is needed to cull walls from the camera's view, working in 2D on the floor of the level
+# Returns the camera position, the direction it faces, how much to scale the distance to the side of the camera so
+# the edges of the view are at 45 degrees, and the near and far clip distances
+def get_cull_view(camera):
+    position = camera.get_position()
+    rotation = camera.get_rotation()
+    fov, aspect_ratio, near_clip, far_clip = camera.get_projection()
+    # The same direction as the camera's rotation matrix looks
+    forward_x = math.sin(rotation)
+    forward_y = -math.cos(rotation)
+    view_scale = 1 / (math.tan(fov / 2) * aspect_ratio)
+    return position[X], position[Y], forward_x, forward_y, view_scale, near_clip, far_clip
+
+# Find which wall is drawn in each column of the screen, from the list of visible walls given by WallMesh.clip
+# The tallest wall in a column is the closest, and if two are as tall the first one is used
+# Returns a (top, bottom, wall index) table with an entry for every column, with a wall index of -1 if no wall is
+# in that column, and sets the depth of the wall in each column in z_buffer
+def solve_columns(walls, screen_width, screen_height, z_buffer):
+    y_buffer = [(0, -1) for _ in range(screen_width + 1)]
+    line_buffer = []
+    for i, mid_line, mid_line_z, top_line, bottom_line in walls:
+        mid_line_g = line_gradient((mid_line[0][X], mid_line_z[0]), (mid_line[1][X], mid_line_z[1]))
+        top_line_g = None if top_line is None else line_gradient(*top_line)
+        bottom_line_g = None if bottom_line is None else line_gradient(*bottom_line)
+
+        min_x = min(mid_line[0][X], mid_line[1][X])
+        max_x = max(mid_line[0][X], mid_line[1][X])
+
+        for x in range(min_x, max_x + 1):
+            if top_line_g is None:
+                y1 = screen_height + 1
+            else:
+                y1 = line_solve_y(x, *top_line_g)
+            if bottom_line_g is None:
+                y2 = 0
+            else:
+                y2 = line_solve_y(x, *bottom_line_g)
+            delta_y = math.fabs(y1 - y2)
+
+            z = line_solve_y(x, *mid_line_g)
+
+            if delta_y > y_buffer[x][0]:
+                y_buffer[x] = (delta_y, len(line_buffer))
+                z_buffer[x] = z
+
+        line_buffer.append((i, top_line_g, bottom_line_g))
+
+    columns = []
+    for x in range(screen_width):
+        line_index = y_buffer[x][1]
+        if line_index == -1:
+            columns.append((0, 0, -1))
+            continue
+        i, top_line_g, bottom_line_g = line_buffer[line_index]
+        if top_line_g is None or top_line_g[1] == 0:
+            top_y = screen_height + 1
+        else:
+            top_y = round(line_solve_y(x, *top_line_g))
+        if bottom_line_g is None or bottom_line_g[1] == 0:
+            bottom_y = 0
+        else:
+            bottom_y = round(line_solve_y(x, *bottom_line_g))
+        columns.append((top_y, bottom_y, i))
+    return columns
+
+# The walls of a level in world space, built once when the level is loaded rather than every frame
+# Wall i joins bound i - 1 to bound i, so wall 0 is the one that closes the level's outline
+class WallMesh:
+    # Create the mesh from a level, with the walls going from wall_bottom to wall_top
+    def __init__(self, level, wall_bottom, wall_top):
+        self.__level = level
+        bounds = level.get_bounds()
+        self.__num_walls = len(bounds)
+
+        # x, y, z for every vertex, bottom, middle then top for each bound
+        self.__vertices = array("d")
+        # x, y for every bound, on the floor of the level
+        self.__points = array("d")
+        for point in bounds:
+            for height in (wall_bottom, 0, wall_top):
+                self.__vertices.extend((point[X], height, point[Y]))
+            self.__points.extend((point[X], point[Y]))
+
+        # The direction each wall faces, pointing into the level, used for shading and culling
+        # Which side is the inside depends on which way round the bounds go
+        winding = 1 if polygon_signed_area(bounds) >= 0 else -1
+        self.__normals = array("d")
+        for i in range(self.__num_walls):
+            self.__normals.extend(vector_multiply(vector_perpendicular(level.get_normal(i - 1)), winding))
+
+    # Get the level the mesh was built from
+    def get_level(self):
+        return self.__level
+
+    # Get the number of walls
+    def get_num_walls(self):
+        return self.__num_walls
+
+    # Get the world space vertices, as a flat array of x, y, z
+    def get_vertices(self):
+        return self.__vertices
+
+    # Get the bounds of the level, as a flat array of x, y
+    def get_points(self):
+        return self.__points
+
+    # Get the normals of every wall, as a flat array of x, y
+    def get_normals(self):
+        return self.__normals
+
+    # Get the normal of a wall, pointing into the level
+    def get_normal(self, wall_index):
+        return self.__normals[2 * wall_index], self.__normals[2 * wall_index + 1]
+
+    # Transform every vertex by a matrix in one pass, returning a list of homogenous points
+    # Each bound's vertices start at VERTICES_PER_BOUND * bound, in the order bottom, middle, top
+    def transform(self, matrix):
+        vertices = self.__vertices
+        return [mat4_multiply(matrix, (vertices[i], vertices[i + 1], vertices[i + 2], 1))
+                for i in range(0, len(vertices), 3)]
+
+    # Transform the vertices of one bound by a matrix, as a list of homogenous points in the order bottom, middle, top
+    def transform_bound(self, matrix, bound_index):
+        vertices = self.__vertices
+        start = 3 * VERTICES_PER_BOUND * bound_index
+        return [mat4_multiply(matrix, (vertices[i], vertices[i + 1], vertices[i + 2], 1))
+                for i in range(start, start + 3 * VERTICES_PER_BOUND, 3)]
+
+    # Get the bounds that a wall joins
+    def get_wall_bounds(self, wall_index):
+        # Wall i joins the previous bound to this one
+        return (wall_index - 1 if wall_index > 0 else self.__num_walls - 1), wall_index
+
+    # Check if a point on the floor is inside the level
+    def contains(self, point):
+        points = self.__points
+        inside = False
+        for i in range(self.__num_walls):
+            j_a, j_b = self.get_wall_bounds(i)
+            a_x, a_y = points[2 * j_a], points[2 * j_a + 1]
+            b_x, b_y = points[2 * j_b], points[2 * j_b + 1]
+            # Count the walls crossed going in the +x direction from the point
+            if (a_y > point[Y]) != (b_y > point[Y]):
+                if point[X] < a_x + (point[Y] - a_y) * (b_x - a_x) / (b_y - a_y):
+                    inside = not inside
+        return inside
+
+    # Find the walls that could be seen by a camera, without transforming or clipping any of them
+    # A wall is culled if its middle line is clearly outside one side of the view, or in front of or behind the clip
+    # distances, as clipping would throw it away anyway
+    # If asked to and the camera is inside the level, walls facing away from it are culled too
+    # The renderer still draws some columns of those walls, so culling them changes the picture
+    # Returns the indices of the walls that are left, and the number that were culled
+    def cull(self, camera, back_faces=False):
+        cull_x, cull_y, forward_x, forward_y, view_scale, near_clip, far_clip = get_cull_view(camera)
+        position = camera.get_position()
+        back_faces = back_faces and self.contains(position)
+
+        # Which planes of the view each bound is outside of
+        points = self.__points
+        outside = []
+        for j in range(self.__num_walls):
+            d_x = points[2 * j] - cull_x
+            d_y = points[2 * j + 1] - cull_y
+            forward = d_x * forward_x + d_y * forward_y
+            side = (d_y * forward_x - d_x * forward_y) * view_scale
+            code = 0
+            if side - forward > CULL_MARGIN: code |= CULL_RIGHT
+            if -side - forward > CULL_MARGIN: code |= CULL_LEFT
+            if forward < near_clip - CULL_MARGIN: code |= CULL_NEAR
+            if forward > far_clip + CULL_MARGIN: code |= CULL_FAR
+            outside.append(code)
+
+        normals = self.__normals
+        visible = []
+        for i in range(self.__num_walls):
+            j_a, j_b = self.get_wall_bounds(i)
+            if outside[j_a] & outside[j_b] != 0:
+                continue
+            if back_faces:
+                facing = (position[X] - points[2 * j_b]) * normals[2 * i] + \
+                         (position[Y] - points[2 * j_b + 1]) * normals[2 * i + 1]
+                if facing < -CULL_MARGIN:
+                    continue
+            visible.append(i)
+        return visible, self.__num_walls - len(visible)
+
+    # Transform and clip walls, and find where the visible ones are on the screen
+    # Only the walls given are used, or every wall if none are given, and only their vertices are transformed
+    # Returns a list of (wall index, middle line, middle depths, top line, bottom line) for every wall whose middle
+    # line can be seen, with the lines in screen coordinates and the top or bottom line None if it cannot be seen
+    def clip(self, matrix, screen_width, screen_height, wall_indices=None):
+        if wall_indices is None:
+            wall_indices = range(self.__num_walls)
+        vertex_buffer = [None] * self.__num_walls
+        walls = []
+        for i in wall_indices:
+            j_a, j_b = self.get_wall_bounds(i)
+            for j in (j_a, j_b):
+                if vertex_buffer[j] is None:
+                    vertex_buffer[j] = self.transform_bound(matrix, j)
+            point_ab, point_am, point_at = vertex_buffer[j_a]
+            point_bb, point_bm, point_bt = vertex_buffer[j_b]
+
+            mid_line = line_clip(point_am, point_bm)
+            if mid_line is None: continue
+            top_line = line_clip(point_at, point_bt)
+            bottom_line = line_clip(point_ab, point_bb)
+
+            mid_line = line_clip_to_screen(*mid_line, screen_width, screen_height)
+            if top_line is not None:
+                top_line = line_clip_to_screen(*top_line, screen_width, screen_height)
+            if bottom_line is not None:
+                bottom_line = line_clip_to_screen(*bottom_line, screen_width, screen_height)
+            walls.append((i, mid_line, (point_am[Z], point_bm[Z]), top_line, bottom_line))
+        return walls
@@ -18,6 +18,21 @@ RIGHT = "Right"
 
 TIMESTEP = 1 / 100
 
+# The ways the walls of a level can be drawn
+ENGINE_MESH    = "MESH"
+ENGINE_RAYCAST = "RAYCAST"
+ENGINES = (ENGINE_MESH, ENGINE_RAYCAST)
+
+# The options used if they are not in the options file, in the same order as the options menu
+DEFAULT_OPTIONS = {
+    "DISPLAY_FPS": False,
+    "TEXT_COLOUR": "22BB00",
+    "BACKGROUND_COLOUR": "000000",
+    "FONT_SIZE": 10,
+    "FPS_CAP": 60,
+    "RENDER_ENGINE": ENGINE_MESH
+}
+
 BEAR_EAT_TIME = 10
 PLAYER_STEAL_TIME = 4
 
@@ -336,10 +351,12 @@ def is_command_yes(command):
     return len(command) > 0 and command[0].upper() == "Y"
 
 # Load the options stored in the options file
+# Any options missing from the file are given their default, in the same order as the options menu
 def load_options():
     filepath = util.abspath("res/options.json")
     with open(filepath, "r") as file:
-        options = json.load(file)
+        options = dict(DEFAULT_OPTIONS)
+        options.update(json.load(file))
     return options
 
 # Save the current options to the options file
@@ -618,6 +635,25 @@ def physics_thread(input_pipe, output_pipe):
                             set_menu_formatting(options_menu_id, options_menu.get_active_index(), (font_size,), output_pipe)
                         else:
                             options_invalid_time = 0
+                    if options_menu.get_active_index() == 5: # FPS cap
+                        try:
+                            fps_cap = int(command)
+                        except ValueError:
+                            fps_cap = None
+                        if fps_cap is not None and fps_cap >= 0:
+                            options["FPS_CAP"] = fps_cap
+                            send_message(output_pipe, Message.UPDATE_SETTING, ("FPS_CAP", fps_cap))
+                            set_menu_formatting(options_menu_id, options_menu.get_active_index(), (fps_cap,), output_pipe)
+                        else:
+                            options_invalid_time = 0
+                    if options_menu.get_active_index() == 6: # Render engine
+                        command = command.upper()
+                        if command in ENGINES:
+                            options["RENDER_ENGINE"] = command
+                            send_message(output_pipe, Message.UPDATE_SETTING, ("RENDER_ENGINE", command))
+                            set_menu_formatting(options_menu_id, options_menu.get_active_index(), (command,), output_pipe)
+                        else:
+                            options_invalid_time = 0
                     save_options(options)
                     command = None
 
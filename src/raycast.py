@@ -0,0 +1,200 @@
+import math
+
+from geometry import X, Y
+from mesh import get_cull_view
+
+# Largest and smallest size of a grid cell, in the same units as the level's bounds
+# Cells are made smaller in levels with a lot of walls close together, so each cell still only has a few walls in
+GRID_MAX_CELL_SIZE = 4
+GRID_MIN_CELL_SIZE = 0.5
+
+# Rays that are this close to parallel with a wall do not hit it
+PARALLEL_EPSILON = 1e-12
+
+# Number of walls each ray keeps going through when finding the walls that could be seen
+# The mesh works from rounded screen ends, so it can draw a column of a wall from behind the one in front
+RAY_MAX_HITS = 6
+
+# Walk through the cells of a grid that a line passes through, in order, using a DDA
+# The line goes from origin to origin + direction * t_end, and cells are given as (cell x, cell y, t at exit)
+def iter_grid_cells(origin, direction, t_end, cell_size):
+    cell_x = math.floor(origin[X] / cell_size)
+    cell_y = math.floor(origin[Y] / cell_size)
+
+    # How far along the line each step to the next cell in x or y is, and where the first one is
+    if direction[X] > 0:
+        step_x = 1
+        t_delta_x = cell_size / direction[X]
+        t_max_x = ((cell_x + 1) * cell_size - origin[X]) / direction[X]
+    elif direction[X] < 0:
+        step_x = -1
+        t_delta_x = -cell_size / direction[X]
+        t_max_x = (cell_x * cell_size - origin[X]) / direction[X]
+    else:
+        step_x = 0
+        t_delta_x = math.inf
+        t_max_x = math.inf
+
+    if direction[Y] > 0:
+        step_y = 1
+        t_delta_y = cell_size / direction[Y]
+        t_max_y = ((cell_y + 1) * cell_size - origin[Y]) / direction[Y]
+    elif direction[Y] < 0:
+        step_y = -1
+        t_delta_y = -cell_size / direction[Y]
+        t_max_y = (cell_y * cell_size - origin[Y]) / direction[Y]
+    else:
+        step_y = 0
+        t_delta_y = math.inf
+        t_max_y = math.inf
+
+    while True:
+        t_exit = min(t_max_x, t_max_y)
+        yield cell_x, cell_y, t_exit
+        if t_exit >= t_end:
+            return
+        if t_max_x < t_max_y:
+            cell_x += step_x
+            t_max_x += t_delta_x
+        else:
+            cell_y += step_y
+            t_max_y += t_delta_y
+
+# Choose a size of grid cell for a level, so that there would be about one wall per cell if they were spread evenly
+def get_grid_cell_size(bounds):
+    if len(bounds) == 0:
+        return GRID_MAX_CELL_SIZE
+    width = max(point[X] for point in bounds) - min(point[X] for point in bounds)
+    height = max(point[Y] for point in bounds) - min(point[Y] for point in bounds)
+    cell_size = math.sqrt(width * height / len(bounds))
+    return max(GRID_MIN_CELL_SIZE, min(GRID_MAX_CELL_SIZE, cell_size))
+
+# A uniform grid over a level, where each cell knows which walls pass through it
+# Used to cast rays through the level to find the walls that could be seen, where each ray only has to check the
+# walls in the cells it passes through
+# Walls are numbered the same way as in WallMesh, wall i joins bound i - 1 to bound i
+class LevelGrid:
+    # Build the grid from the bounds of a level, choosing a cell size to suit it if none is given
+    def __init__(self, level, cell_size=None):
+        self.__level = level
+        bounds = level.get_bounds()
+        if cell_size is None:
+            cell_size = get_grid_cell_size(bounds)
+        self.__cell_size = cell_size
+        self.__walls = [(bounds[i - 1], bounds[i]) for i in range(len(bounds))]
+        self.__cells = {}
+        self.__num_cells_traversed = 0
+
+        for i, (a, b) in enumerate(self.__walls):
+            direction = b[X] - a[X], b[Y] - a[Y]
+            for cell_x, cell_y, _ in iter_grid_cells(a, direction, 1, cell_size):
+                self.__cells.setdefault((cell_x, cell_y), []).append(i)
+
+        # Rays stop once they leave the cells that have any walls in
+        # A level with no walls has no cells, so there is nothing for a ray to hit
+        if len(self.__cells) == 0:
+            self.__min_cell = self.__max_cell = None
+            return
+        cell_xs = [cell[0] for cell in self.__cells]
+        cell_ys = [cell[1] for cell in self.__cells]
+        self.__min_cell = min(cell_xs), min(cell_ys)
+        self.__max_cell = max(cell_xs), max(cell_ys)
+
+    # Get the level the grid was built from
+    def get_level(self):
+        return self.__level
+
+    # Get the size of each cell
+    def get_cell_size(self):
+        return self.__cell_size
+
+    # Get the number of cells that have walls in
+    def get_num_cells(self):
+        return len(self.__cells)
+
+    # Get the number of cells the rays passed through in the last call to find_walls
+    def get_num_cells_traversed(self):
+        return self.__num_cells_traversed
+
+    # Find the walls a ray hits between t_min and t_max along it, nearest first, stopping after max_hits of them
+    # Returns a list of (t, wall index), which is empty if no wall is hit
+    def cast_ray(self, origin, direction, t_min, t_max, max_hits=1):
+        if len(self.__cells) == 0:
+            return []
+        walls = self.__walls
+        cells = self.__cells
+        min_cell = self.__min_cell
+        max_cell = self.__max_cell
+        checked = set()
+        hits = []
+        for cell_x, cell_y, t_exit in iter_grid_cells(origin, direction, t_max, self.__cell_size):
+            self.__num_cells_traversed += 1
+            if not (min_cell[X] <= cell_x <= max_cell[X] and min_cell[Y] <= cell_y <= max_cell[Y]):
+                # Outside of the grid, so if the ray is moving away from it nothing else can be hit
+                if (cell_x < min_cell[X] and direction[X] <= 0) or (cell_x > max_cell[X] and direction[X] >= 0) or \
+                        (cell_y < min_cell[Y] and direction[Y] <= 0) or (cell_y > max_cell[Y] and direction[Y] >= 0):
+                    break
+                continue
+            for i in cells.get((cell_x, cell_y), ()):
+                if i in checked:
+                    continue
+                checked.add(i)
+                a, b = walls[i]
+                # Solve origin + direction * t = a + (b - a) * u
+                e_x = b[X] - a[X]
+                e_y = b[Y] - a[Y]
+                denominator = direction[X] * e_y - direction[Y] * e_x
+                if math.fabs(denominator) < PARALLEL_EPSILON:
+                    continue
+                d_x = a[X] - origin[X]
+                d_y = a[Y] - origin[Y]
+                t = (d_x * e_y - d_y * e_x) / denominator
+                u = (d_x * direction[Y] - d_y * direction[X]) / denominator
+                if 0 <= u <= 1 and t_min <= t <= t_max:
+                    hits.append((t, i))
+            hits.sort()
+            del hits[max_hits:]
+            # A wall in a later cell can not be closer than the ones already hit in this cell or before it
+            if len(hits) == max_hits and hits[-1][0] <= t_exit:
+                break
+        return hits
+
+    # Find the walls that could be seen by a camera, by casting a ray at each edge of each column of the screen
+    # Every ray goes through up to RAY_MAX_HITS walls, and the walls next to each one it hits are kept too, as the
+    # mesh can draw a wall a column past its end where it meets the next one
+    # Returns the sorted indices of the walls, to be clipped and solved the same way as the mesh
+    def find_walls(self, camera, screen_width):
+        position_x, position_y, forward_x, forward_y, view_scale, near_clip, far_clip = get_cull_view(camera)
+        walls = self.__walls
+        num_walls = len(walls)
+
+        self.__num_cells_traversed = 0
+        origin = position_x, position_y
+        wall_indices = set()
+        nearest = []
+        for x in range(screen_width + 1):
+            # The ray moves one unit forward for each unit along it, so t is the distance in front of the camera
+            side = (2 * x / screen_width - 1) / view_scale
+            direction = forward_x - forward_y * side, forward_y + forward_x * side
+            hits = self.cast_ray(origin, direction, near_clip, far_clip, RAY_MAX_HITS)
+            nearest.append(hits[0][0] if len(hits) > 0 else math.inf)
+            for _, i in hits:
+                wall_indices.update(((i - 1) % num_walls, i, (i + 1) % num_walls))
+
+        # A wall can fit between two rays without either of them hitting it, but then both of its ends are in view
+        # The walls at each bound in view are kept, unless the rays around it all hit something in front of it
+        for j in range(num_walls):
+            bound = walls[j][1]
+            d_x = bound[X] - position_x
+            d_y = bound[Y] - position_y
+            forward = d_x * forward_x + d_y * forward_y
+            if not near_clip <= forward <= far_clip:
+                continue
+            column = math.floor(((d_y * forward_x - d_x * forward_y) * view_scale / forward + 1) / 2 * screen_width)
+            first = max(0, column - 1)
+            last = min(screen_width, column + 2)
+            if first > last:
+                continue
+            if max(nearest[first:last + 1]) >= forward:
+                wall_indices.update((j, (j + 1) % num_walls))
+        return sorted(wall_indices)
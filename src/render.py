@@ -1,6 +1,13 @@
+import math
 import os
+import re
+import json
+import mmap
+import time
+import struct
+from bisect import bisect_left
+from collections import OrderedDict
 
-from console import Console
 from geometry import *
 import util
 
@@ -11,31 +18,220 @@ ALIGN_BOTTOM = 1
 ALIGN_CENTER = 2
 
 SPACE_CHAR = ord(" ")
+NEWLINE_CHAR = ord("\n")
+
+# Textures are stepped through in fixed point numbers, with this many bits after the point
+FIXED_SHIFT = 16
+FIXED_ONE = 1 << FIXED_SHIFT
+
+# Translation table used when converting the buffer to a string, empty (0) bytes become spaces
+BUFFER_TRANSLATION = bytes.maketrans(b"\0", b" ")
+
+# Version 1 textures are the width and height as single bytes, followed by the pixels
+# Version 2 textures start with a header: the magic bytes, the version, flags, and the width and height as 16 bit numbers
+# After the header is the opaque span table, for each row the number of spans, then the start and end (exclusive) of each
+# The pixels come last, either as they are or run length encoded as (count, value) byte pairs
+# All numbers in the header and span table are little endian
+TEXTURE_MAGIC = b"\0TEX"
+TEXTURE_HEADER = struct.Struct("<4sBBHH")
+TEXTURE_SPAN_COUNT = struct.Struct("<H")
+TEXTURE_FLAG_RLE = 1
+
+# Spaces in a texture are transparent, anything else is opaque
+OPAQUE_RUN = re.compile(rb"[^ ]+")
+
+# Patterns matching runs of anything but a transparent value, compiled the first time each value is used
+RUN_PATTERNS = {SPACE_CHAR: OPAQUE_RUN}
+
+# Get the pattern matching runs of anything but a transparent value
+def run_pattern(transparent):
+    pattern = RUN_PATTERNS.get(transparent)
+    if pattern is None:
+        pattern = re.compile(b"[^" + re.escape(bytes((transparent,))) + b"]+")
+        RUN_PATTERNS[transparent] = pattern
+    return pattern
+
+# Find the opaque spans in a row or column of pixels, as (start, end) pairs with the end exclusive
+def find_opaque_spans(pixels):
+    return [match.span() for match in OPAQUE_RUN.finditer(pixels)]
+
+# Expand run length encoded (count, value) pairs back into pixels
+def decode_texture_rle(data):
+    return b"".join(bytes((data[i + 1],)) * data[i] for i in range(0, len(data) - 1, 2))
+
+# Build a version 2 texture from a sampler, with the pixels left unencoded so they can be used where they are
+def encode_texture(sampler):
+    width = sampler.get_width()
+    height = sampler.get_height()
+    output = bytearray(TEXTURE_HEADER.pack(TEXTURE_MAGIC, 2, 0, width, height))
+    for y in range(height):
+        spans = sampler.get_row_spans(y)
+        output += TEXTURE_SPAN_COUNT.pack(len(spans))
+        for start, end in spans:
+            output += struct.pack("<HH", start, end)
+    for y in range(height):
+        output += sampler.get_row(y)
+    return output
+
+# Every texture under a directory packed into one file by atlas.py
+# The file is the magic bytes and the length of the index, the index as json, then the textures one after another
+# The index maps the path of each texture, relative to the directory, to its offset after the index and its length
+TEXTURE_DIRECTORY = "res/textures"
+TEXTURE_ATLAS_PATH = "res/textures.atlas"
+ATLAS_MAGIC = b"\0ATL"
+ATLAS_HEADER = struct.Struct("<4sI")
+
+# A texture atlas, memory mapped so textures are views into it rather than copies
+# Every process that maps it shares the same memory
+class TextureAtlas:
+    # The atlas used by samplers, loaded the first time it is needed
+    _default = None
+    _default_loaded = False
+
+    # Get the atlas for the texture directory, or None if it has not been built
+    @classmethod
+    def get_default(cls):
+        if not cls._default_loaded:
+            cls._default_loaded = True
+            filepath = util.abspath(TEXTURE_ATLAS_PATH)
+            if os.path.isfile(filepath):
+                cls._default = TextureAtlas(filepath, util.abspath(TEXTURE_DIRECTORY))
+        return cls._default
+
+    # Map an atlas file, the directory is the one the textures were packed from
+    def __init__(self, filepath, directory):
+        with open(filepath, 'rb') as file:
+            self.__map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.__view = memoryview(self.__map)
+        magic, index_length = ATLAS_HEADER.unpack_from(self.__view)
+        if magic != ATLAS_MAGIC:
+            raise ValueError(f"{filepath} is not a texture atlas")
+        index_start = ATLAS_HEADER.size
+        self.__index = json.loads(bytes(self.__view[index_start:index_start + index_length]))
+        self.__data_start = index_start + index_length
+        self.__directory = directory
+
+    # Get the name a file is stored under in the atlas
+    def __get_name(self, filepath):
+        return os.path.relpath(filepath, self.__directory).replace(os.path.sep, "/")
+
+    # Get a view of a texture from its absolute path, or None if it is not in the atlas
+    def get_texture(self, filepath):
+        entry = self.__index.get(self.__get_name(filepath))
+        if entry is None:
+            return None
+        offset, length = entry
+        start = self.__data_start + offset
+        return self.__view[start:start + length]
+
+    # Get the absolute paths of the textures in a directory, sorted by name, or None if there are none in the atlas
+    def list_directory(self, directory):
+        prefix = self.__get_name(directory) + "/"
+        names = sorted(name for name in self.__index if name.startswith(prefix) and "/" not in name[len(prefix):])
+        if len(names) == 0:
+            return None
+        return [os.path.join(self.__directory, *name.split("/")) for name in names]
+
+# Get the pixel used for each of cells first to last, when stretching a number of pixels over a number of cells
+# Each is the nearest pixel to the cell, and they never decrease, so only the last few need clamping to the edge
+def stretch_indices(size, cells, first, last):
+    if size % cells == 0:
+        # Every cell moves a whole number of pixels, so no rounding is needed
+        step = size // cells
+        indices = list(range(first * step, last * step + 1, step))
+    else:
+        indices = [round(i / cells * size) for i in range(first, last + 1)]
+    end = bisect_left(indices, size)
+    if end < len(indices):
+        indices[end:] = [size - 1] * (len(indices) - end)
+    return indices
 
 # An image sampler, allows .tex files to be accessed by direct pixel, or by a range 0-1
 class Sampler:
+    # Keep track of how many samplers have been loaded, and how long it took, for this process
+    _load_count = 0
+    _load_time = 0
+
+    # The first sampler loaded for each texture in this process, so other processes can refer to it by path
+    _loaded = {}
+
+    # Get the number of samplers loaded so far, and the total time taken in seconds
+    @classmethod
+    def get_load_stats(cls):
+        return cls._load_count, cls._load_time
+
     # Initialise class using a filepath as the source data
-    def __init__(self, filepath, trust_path=False):
-        self.__width = 0
-        self.__height = 0
-        self.__data = None
+    # The texture is taken from the atlas if it is in there, otherwise the file is read
+    def __init__(self, filepath, trust_path=False, use_atlas=True):
+        start_time = time.perf_counter()
         if not trust_path:
             filepath = util.abspath(filepath)
-        with open(filepath, 'rb') as file:
-            index = -2
-            while byte := file.read(1):
-                # First two bytes represent the width and height of the texture
-                if index == 0:
-                    self.__data = bytearray(self.__width * self.__height * 8)
-                if index == -2:
-                    self.__width = int.from_bytes(byte, 'little')
-                elif index == -1:
-                    self.__height = int.from_bytes(byte, 'little')
-                else:
-                    self.__data[index] = int.from_bytes(byte, 'little')
-                index += 1
-        while len(self.__data) < self.__width * self.__height:
-            self.__data.append(ord(" "))
+        self.__filepath = filepath
+        self.__use_atlas = use_atlas
+        Sampler._loaded.setdefault((filepath, use_atlas), self)
+        raw_data = None
+        atlas = TextureAtlas.get_default() if use_atlas else None
+        if atlas is not None:
+            raw_data = atlas.get_texture(filepath)
+        if raw_data is None:
+            # Read the whole file at once
+            with open(filepath, 'rb') as file:
+                raw_data = file.read()
+        # Work out which version it is from the start of it
+        if raw_data[:len(TEXTURE_MAGIC)] == TEXTURE_MAGIC:
+            self.__load_v2(raw_data)
+        else:
+            self.__load_v1(raw_data)
+        # Column spans are only needed for some textures, so are found the first time they are asked for
+        self.__column_spans = [None] * self.__width
+
+        self.__load_time = time.perf_counter() - start_time
+        Sampler._load_count += 1
+        Sampler._load_time += self.__load_time
+
+    # Load a version 1 texture, the first two bytes represent the width and height of the texture
+    def __load_v1(self, raw_data):
+        self.__width = raw_data[0]
+        self.__height = raw_data[1]
+        self.__set_pixels(raw_data[2:])
+        # There is no span table stored, so the spans are found from the pixels the first time they are asked for
+        self.__span_table = None
+        self.__row_spans = [None] * self.__height
+
+    # Load a version 2 texture, the span table is stored so only the pixels need to be read
+    def __load_v2(self, raw_data):
+        _, version, flags, self.__width, self.__height = TEXTURE_HEADER.unpack_from(raw_data)
+        if version != 2:
+            raise ValueError(f"Unsupported texture version {version}")
+        # Only the position of each row in the span table is found here, the spans are read when they are needed
+        offset = TEXTURE_HEADER.size
+        self.__span_table = raw_data
+        self.__span_offsets = []
+        for _ in range(self.__height):
+            self.__span_offsets.append(offset)
+            num_spans, = TEXTURE_SPAN_COUNT.unpack_from(raw_data, offset)
+            offset += TEXTURE_SPAN_COUNT.size + num_spans * 4
+        self.__row_spans = [None] * self.__height
+        if flags & TEXTURE_FLAG_RLE:
+            self.__set_pixels(decode_texture_rle(raw_data[offset:]))
+        else:
+            self.__set_pixels(raw_data[offset:])
+
+    # Keep exactly width * height pixels, anything after them is ignored and missing pixels are blank
+    def __set_pixels(self, pixels):
+        size = self.__width * self.__height
+        self.__data = pixels[:size]
+        if len(self.__data) < size:
+            self.__data = bytes(self.__data) + bytes((SPACE_CHAR,)) * (size - len(self.__data))
+
+    # Samplers are sent to other processes as their path, as a view of the atlas cannot be sent
+    # The other process then uses its own copy of the texture, only loading it if it has not already
+    def __reduce__(self):
+        return load_sampler, (self.__filepath, self.__use_atlas)
+
+    # Get the time taken to load this sampler, in seconds
+    def get_load_time(self):
+        return self.__load_time
 
     # Get a pixel at a certain coordinate
     def get_pixel(self, x, y):
@@ -43,26 +239,130 @@ class Sampler:
         if x <= 0:
             x = 0
         if x >= self.__width:
-            x = self.__height - 1
+            x = self.__width - 1
         if y <= 0:
             y = 0
         if y >= self.__height:
             y = self.__height - 1
         return self.__data[y * self.__width + x]
 
+    # Get the width of the texture
+    def get_width(self):
+        return self.__width
+
+    # Get the height of the texture
+    def get_height(self):
+        return self.__height
+
     # Get value by using floats between 0 and 1
     def sample(self, x, y):
         sx = round(x * self.__width)
         sy = round(y * self.__height)
         return self.get_pixel(sx, sy)
 
+    # Get the pixel x coordinates to use for cells first to last, when stretching the texture over a number of cells
+    # Each is the same pixel that sample would use, and they never decrease
+    def sample_xs(self, cells, first=0, last=None):
+        return stretch_indices(self.__width, cells, first, cells if last is None else last)
+
+    # Get the pixel y coordinates to use for cells first to last, when stretching the texture over a number of cells
+    def sample_ys(self, cells, first=0, last=None):
+        return stretch_indices(self.__height, cells, first, cells if last is None else last)
+
+    # Get the row at v stretched over a number of cells, as one byte per cell, the same as sampling each cell
+    # Only cells first up to but not including last are given, which defaults to all of them
+    # Cells past the end of the row are clamped to its last pixel
+    def sample_row(self, v, cells, first=0, last=None):
+        if last is None:
+            last = cells
+        if first >= last:
+            return b""
+        row = self.get_row(round(v * self.__height))
+        return bytes(map(row.__getitem__, self.sample_xs(cells, first, last - 1)))
+
+    # Get the column at u stretched over a number of cells, as one byte per cell, the same as sampling each cell
+    # Only cells first up to but not including last are given, which defaults to all of them
+    # Cells past the end of the column are clamped to its last pixel
+    def sample_column(self, u, cells, first=0, last=None):
+        if last is None:
+            last = cells
+        if first >= last:
+            return b""
+        column = self.get_column(round(u * self.__width))
+        return bytes(map(column.__getitem__, self.sample_ys(cells, first, last - 1)))
+
+    # Get a number of pixels along a line through the texture, stepping in fixed point from a starting pixel
+    # Pixels are clamped to the edges of the texture like get_pixel
+    def sample_stepped(self, texture_x, texture_y, step_x, step_y, count):
+        if count <= 0:
+            return b""
+        width = self.__width
+        height = self.__height
+        data = self.__data
+        last = count - 1
+        # The line is straight, so if both ends are inside the texture then every pixel is, and none need clamping
+        if (0 <= texture_x >> FIXED_SHIFT < width and 0 <= (texture_x + last * step_x) >> FIXED_SHIFT < width and
+                0 <= texture_y >> FIXED_SHIFT < height and 0 <= (texture_y + last * step_y) >> FIXED_SHIFT < height):
+            return bytes([data[((texture_y + i * step_y) >> FIXED_SHIFT) * width + ((texture_x + i * step_x) >> FIXED_SHIFT)]
+                          for i in range(count)])
+        return bytes([data[max(0, min(height - 1, (texture_y + i * step_y) >> FIXED_SHIFT)) * width +
+                           max(0, min(width - 1, (texture_x + i * step_x) >> FIXED_SHIFT))] for i in range(count)])
+
+    # Get a row of pixels
+    def get_row(self, y):
+        y = max(0, min(self.__height - 1, y))
+        return self.__data[y * self.__width:(y + 1) * self.__width]
+
+    # Get a column of pixels
+    def get_column(self, x):
+        x = max(0, min(self.__width - 1, x))
+        return bytes(self.__data[x::self.__width])
+
+    # Get the opaque spans in a row, as (start, end) pairs with the end exclusive
+    def get_row_spans(self, y):
+        y = max(0, min(self.__height - 1, y))
+        spans = self.__row_spans[y]
+        if spans is None:
+            if self.__span_table is not None:
+                offset = self.__span_offsets[y]
+                num_spans, = TEXTURE_SPAN_COUNT.unpack_from(self.__span_table, offset)
+                bounds = struct.unpack_from(f"<{num_spans * 2}H", self.__span_table, offset + TEXTURE_SPAN_COUNT.size)
+                spans = list(zip(bounds[0::2], bounds[1::2]))
+            else:
+                spans = find_opaque_spans(self.get_row(y))
+            self.__row_spans[y] = spans
+        return spans
+
+    # Get the opaque spans in a column, as (start, end) pairs with the end exclusive
+    def get_column_spans(self, x):
+        x = max(0, min(self.__width - 1, x))
+        spans = self.__column_spans[x]
+        if spans is None:
+            spans = find_opaque_spans(self.get_column(x))
+            self.__column_spans[x] = spans
+        return spans
+
+# Get the sampler for a texture from its absolute path, only loading it the first time it is asked for in this process
+def load_sampler(filepath, use_atlas=True):
+    sampler = Sampler._loaded.get((filepath, use_atlas))
+    if sampler is None:
+        sampler = Sampler(filepath, trust_path=True, use_atlas=use_atlas)
+    return sampler
+
 # Create an array of samplers - uses all files in a directory
 def sampler_array(directory):
     directory = util.abspath(directory)
-    samplers = []
-    for file in sorted(os.listdir(directory)):
-        samplers.append(Sampler(os.path.join(directory, file), trust_path=True))
-    return samplers
+    # The atlas knows which textures are in the directory, so it does not need to be read
+    atlas = TextureAtlas.get_default()
+    filepaths = atlas.list_directory(directory) if atlas is not None else None
+    if filepaths is None:
+        filepaths = [os.path.join(directory, file) for file in sorted(os.listdir(directory))]
+    return [Sampler(filepath, trust_path=True) for filepath in filepaths]
+
+# Check if a cell on a row of a circle is within the radius
+def circle_contains(x, width, v_squared):
+    u = x / width * 2 - 1
+    return (u * u) + v_squared <= 1
 
 # Buffer class, makes an array of bytes that can be converted to a string to be rendered
 class Buffer:
@@ -71,6 +371,17 @@ class Buffer:
         self.__width = width
         self.__height = height
         self.__buffer = bytearray(width * height)
+        self.__output = None
+        self.__presented = None
+        self.__create_output()
+
+    # Create the output storage, one row is the width of the buffer plus a newline
+    # Newlines are written once here, so they don't have to be inserted every frame
+    def __create_output(self):
+        row_length = self.__width + 1
+        self.__output = bytearray(row_length * self.__height)
+        for y in range(self.__height):
+            self.__output[y * row_length + self.__width] = NEWLINE_CHAR
 
     # Change the size of the buffer, necessary if the window is resized
     def resize(self, width, height):
@@ -79,6 +390,8 @@ class Buffer:
         self.__width = width
         self.__height = height
         self.__buffer = bytearray(width * height)
+        self.__presented = None
+        self.__create_output()
 
     # Clear the data contained in the buffer
     def swap(self):
@@ -99,49 +412,365 @@ class Buffer:
         if (0 <= x < self.__width) and (0 <= y < self.__height):
             self.set(x, y, value)
 
+    # Fill a horizontal span of the buffer, from x1 to x2 inclusive, clipped to the buffer
+    def fill_span(self, x1, x2, y, value):
+        if not 0 <= y < self.__height:
+            return
+        x1 = max(0, x1)
+        x2 = min(self.__width - 1, x2)
+        if x1 > x2:
+            return
+        start = y * self.__width
+        self.__buffer[start + x1:start + x2 + 1] = bytes((value,)) * (x2 - x1 + 1)
+
+    # Fill a vertical column of the buffer, from y1 to y2 inclusive, clipped to the buffer
+    def fill_column(self, x, y1, y2, value):
+        if not 0 <= x < self.__width:
+            return
+        y1 = max(0, y1)
+        y2 = min(self.__height - 1, y2)
+        if y1 > y2:
+            return
+        # A stepped slice covers every cell in the column with a single assignment
+        width = self.__width
+        self.__buffer[y1 * width + x:y2 * width + x + 1:width] = bytes((value,)) * (y2 - y1 + 1)
+
+    # Fill a rectangle of the buffer, corners are inclusive, clipped to the buffer
+    def fill_rectangle(self, x1, y1, x2, y2, value):
+        x1 = max(0, x1)
+        y1 = max(0, y1)
+        x2 = min(self.__width - 1, x2)
+        y2 = min(self.__height - 1, y2)
+        if x1 > x2 or y1 > y2:
+            return
+        width = self.__width
+        if x1 == 0 and x2 == width - 1:
+            # Full width rows are contiguous, so can be filled all at once
+            self.__buffer[y1 * width:(y2 + 1) * width] = bytes((value,)) * (width * (y2 - y1 + 1))
+            return
+        row = bytes((value,)) * (x2 - x1 + 1)
+        for y in range(y1, y2 + 1):
+            start = y * width
+            self.__buffer[start + x1:start + x2 + 1] = row
+
+    # Write a row of bytes starting at a position, clipped to the buffer
+    def write(self, x, y, data):
+        if not 0 <= y < self.__height or x >= self.__width:
+            return
+        if x < 0:
+            data = data[-x:]
+            x = 0
+        if x + len(data) > self.__width:
+            data = data[:self.__width - x]
+        if len(data) == 0:
+            return
+        start = y * self.__width + x
+        self.__buffer[start:start + len(data)] = data
+
+    # Write a column of bytes downwards from a position, clipped to the buffer
+    def write_column(self, x, y, data):
+        if not 0 <= x < self.__width or y >= self.__height:
+            return
+        if y < 0:
+            data = data[-y:]
+            y = 0
+        if y + len(data) > self.__height:
+            data = data[:self.__height - y]
+        if len(data) == 0:
+            return
+        width = self.__width
+        start = y * width + x
+        self.__buffer[start:start + (len(data) - 1) * width + 1:width] = data
+
+    # Write a column of bytes, but leave the buffer untouched wherever the transparent value appears
+    def write_column_masked(self, x, y, data, transparent=0):
+        if not 0 <= x < self.__width:
+            return
+        # Each run between transparent bytes is written with one slice
+        for match in run_pattern(transparent).finditer(data):
+            self.write_column(x, y + match.start(), match.group())
+
+    # Find the runs of the buffer that have been drawn to, as (index, run) pairs
+    # A run can carry on from the end of one row to the start of the next, as it only ever goes back into a buffer this size
+    def find_runs(self):
+        return [(match.start(), match.group()) for match in run_pattern(0).finditer(self.__buffer)]
+
+    # Write runs found in a buffer of the same size, leaving the rest of this buffer untouched
+    def write_runs(self, runs):
+        buffer = self.__buffer
+        for index, run in runs:
+            buffer[index:index + len(run)] = run
+
+    # Write a row of bytes, but leave the buffer untouched wherever the transparent value appears
+    def write_masked(self, x, y, data, transparent=0):
+        if not 0 <= y < self.__height:
+            return
+        # Each run between transparent bytes is written with one slice
+        for match in run_pattern(transparent).finditer(data):
+            self.write(x + match.start(), y, match.group())
+
     # Return the buffer data as a string
     def as_string(self):
-        string = ""
-        count = 0
-        for byte in self.__buffer:
-            if byte == 0:
-                string += " "
-            else:
-                string += chr(byte)
-            count += 1
-            if count == self.__width:
-                string += "\n"
-                count = 0
-        return string
+        width = self.__width
+        row_length = width + 1
+        output = self.__output
+        # Empty bytes become spaces in a single pass
+        buffer = memoryview(self.__buffer.translate(BUFFER_TRANSLATION))
+        # Copy whole rows into the output, leaving the newlines in place
+        for y in range(self.__height):
+            start = y * row_length
+            output[start:start + width] = buffer[y * width:(y + 1) * width]
+        # latin-1 maps each byte to the same character as chr()
+        return output.decode("latin-1")
+
+    # Find the rows that have changed since this was last called, as (row index, row) pairs
+    # After a resize, every row counts as changed
+    def changed_rows(self):
+        buffer = self.__buffer
+        presented = self.__presented
+        if presented is not None and buffer == presented:
+            return []
+        self.__presented = bytes(buffer)
+
+        width = self.__width
+        translated = buffer.translate(BUFFER_TRANSLATION)
+        rows = []
+        if presented is None:
+            for y in range(self.__height):
+                rows.append((y, translated[y * width:(y + 1) * width].decode("latin-1")))
+            return rows
+
+        buffer = memoryview(buffer)
+        presented = memoryview(presented)
+        for y in range(self.__height):
+            start = y * width
+            end = start + width
+            if buffer[start:end] != presented[start:end]:
+                rows.append((y, translated[start:end].decode("latin-1")))
+        return rows
+
+    # Get the width of the buffer
+    def get_width(self):
+        return self.__width
+
+    # Get the height of the buffer
+    def get_height(self):
+        return self.__height
 
     # Return the length of the buffer
     def __len__(self):
         return len(self.__buffer)
 
-# Console GUI class, allows console to render lines, triangles, samplers or rectangles
-class ConsoleGUI(Console):
-    # Initialise with a width, height and an x, y coordinate
-    def __init__(self, width, height, x, y):
-        super().__init__(width, height, x, y, 5, fg="#22BB00")
-        self._buffer = Buffer(self.get_width_chars(), self.get_height_chars())
-
-    # Called when the window changes size, meaning the buffer needs to be resized
-    def configure_event(self, event):
-        self._buffer.resize(self.get_width_chars(), self.get_height_chars())
+# Scale a sprite to cover (width + 1) x (height + 1) cells, the same as it is drawn by draw_sprite
+# Each row is a list of (x, run) pairs, one for each run of opaque cells, so transparent cells are never stored
+def scale_sprite(sampler, width, height):
+    xs = sampler.sample_xs(width)
+    rows = []
+    for sampler_y in sampler.sample_ys(height):
+        row = sampler.get_row(sampler_y)
+        runs = []
+        for start, end in sampler.get_row_spans(sampler_y):
+            i1 = bisect_left(xs, start)
+            i2 = bisect_left(xs, end)
+            if i1 < i2:
+                runs.append((i1, bytes(map(row.__getitem__, xs[i1:i2]))))
+        rows.append(runs)
+    return rows
+
+# Scale one column of a texture to cover cells + 1 cells, the same as it is drawn by draw_sampler_column
+# The column is a list of (y, run) pairs, one for each run of opaque cells
+def scale_column(sampler, sampler_x, cells):
+    column = sampler.get_column(sampler_x)
+    ys = sampler.sample_ys(cells)
+    runs = []
+    for start, end in sampler.get_column_spans(sampler_x):
+        i1 = bisect_left(ys, start)
+        i2 = bisect_left(ys, end)
+        if i1 < i2:
+            runs.append((i1, bytes(map(column.__getitem__, ys[i1:i2]))))
+    return runs
+
+# Lay out text to be drawn, as its width and height, and the runs of characters to write on each row
+# Lines are padded to the same width depending on the justify option, the padding is left transparent
+# Spaces are NOT used to pad, as then it cannot be distinguished from actual spaces in the string
+def layout_text(text, justify):
+    lines = text.split("\n")
+    max_width = max(len(line) for line in lines)
+    rows = []
+    for line in lines:
+        if justify == ALIGN_LEFT:
+            line = line.ljust(max_width, "\0")
+        elif justify == ALIGN_RIGHT:
+            line = line.rjust(max_width, "\0")
+        elif justify == ALIGN_CENTER:
+            line = line.center(max_width, "\0")
+        rows.append([(match.start(), match.group()) for match in run_pattern(0).finditer(line.encode("latin-1"))])
+    return max_width, len(lines), rows
+
+# The most each cache of scaled textures can hold, in cells
+SPRITE_CACHE_SIZE = 1 << 20
+COLUMN_CACHE_SIZE = 1 << 20
+
+# The most the text layout cache can hold, in characters
+TEXT_CACHE_SIZE = 1 << 16
+
+# The most the layer cache can hold, in cells
+LAYER_CACHE_SIZE = 1 << 21
+
+# A least recently used cache of scaled textures, so a texture drawn at the same size as before is only copied
+# The size of each entry is counted, and the least recently used are removed until the cache fits in its size
+class ScaledCache:
+    # Initialise an empty cache that can hold up to a number of cells
+    def __init__(self, max_size):
+        self.__max_size = max_size
+        self.__size = 0
+        self.__entries = OrderedDict()
+        self.__hits = 0
+        self.__misses = 0
+
+    # Get the entry for a key, creating it from the function and arguments if it is not in the cache
+    # Returns None if an entry of that size would not fit in the cache
+    def get(self, key, size, create, *args):
+        entry = self.__entries.get(key)
+        if entry is not None:
+            self.__entries.move_to_end(key)
+            self.__hits += 1
+            return entry[0]
+
+        self.__misses += 1
+        if size > self.__max_size:
+            return None
+        value = create(*args)
+        self.__entries[key] = (value, size)
+        self.__size += size
+        while self.__size > self.__max_size:
+            _, (_, evicted_size) = self.__entries.popitem(last=False)
+            self.__size -= evicted_size
+        return value
+
+    # Remove every entry from the cache
+    def clear(self):
+        self.__entries.clear()
+        self.__size = 0
+
+    # Get the number of entries that were already in the cache when asked for
+    def get_hits(self):
+        return self.__hits
+
+    # Get the number of entries that had to be created when asked for
+    def get_misses(self):
+        return self.__misses
+
+    # Get the number of cells held by the cache
+    def get_size(self):
+        return self.__size
+
+    # Get the number of entries held by the cache
+    def __len__(self):
+        return len(self.__entries)
+
+# Renderer class, can render lines, triangles, samplers or rectangles into a buffer
+# It does not know where the buffer ends up, so it has no need for tkinter, subclasses decide how to display it
+class Renderer:
+    # Initialise with the width and height of the buffer, in characters
+    def __init__(self, width_chars, height_chars):
+        self._buffer = Buffer(width_chars, height_chars)
+        self.__sprite_cache = ScaledCache(SPRITE_CACHE_SIZE)
+        self.__column_cache = ScaledCache(COLUMN_CACHE_SIZE)
+        self.__text_cache = ScaledCache(TEXT_CACHE_SIZE)
+        self.__layer_cache = ScaledCache(LAYER_CACHE_SIZE)
+
+    # Overrideable method, get the width, in characters, of the output
+    def get_width_chars(self):
+        return 0
+
+    # Overrideable method, get the height, in characters, of the output
+    def get_height_chars(self):
+        return 0
+
+    # Overrideable method, get the width, in pixels, of the output
+    def get_width(self):
+        return 0
+
+    # Overrideable method, get the height, in pixels, of the output
+    def get_height(self):
+        return 0
+
+    # Overrideable method, set the text colour of the output
+    def set_text_colour(self, colour):
+        pass
+
+    # Overrideable method, set the background colour of the output
+    def set_background_colour(self, colour):
+        pass
+
+    # Overrideable method, set the font size of the output
+    def set_font_size(self, font_size):
+        pass
+
+    # Get the cache of scaled sprites used by draw_sprite
+    def get_sprite_cache(self):
+        return self.__sprite_cache
+
+    # Get the cache of scaled texture columns used by draw_sampler_column
+    def get_column_cache(self):
+        return self.__column_cache
+
+    # Get the cache of text layouts used by draw_text
+    def get_text_cache(self):
+        return self.__text_cache
+
+    # Get the cache of layers used by draw_layer
+    def get_layer_cache(self):
+        return self.__layer_cache
+
+    # Forget every layer, so they are all drawn again the next time they are used
+    def clear_layers(self):
+        self.__layer_cache.clear()
+
+    # Draw something that only changes when its arguments or the size of the output do
+    # It is drawn once into a layer of its own, which is then copied over the buffer each time it is used
+    def draw_layer(self, draw, *args):
+        width_chars = self._buffer.get_width()
+        height_chars = self._buffer.get_height()
+        key = draw.__name__, args, width_chars, height_chars, self.get_width(), self.get_height()
+        runs = self.__layer_cache.get(key, width_chars * height_chars, self.__render_layer, draw, args)
+        if runs is None:
+            draw(*args)
+        else:
+            self._buffer.write_runs(runs)
+
+    # Draw into an empty buffer instead of the real one, and find the runs that were drawn
+    def __render_layer(self, draw, args):
+        buffer = self._buffer
+        self._buffer = Buffer(buffer.get_width(), buffer.get_height())
+        try:
+            draw(*args)
+            return self._buffer.find_runs()
+        finally:
+            self._buffer = buffer
+
+    # Overrideable method, display the buffer and clear it for the next frame
+    def swap_buffers(self):
+        pass
 
     # Draw a line between two points
     def draw_line(self, a, b, fill="#"):
         fill = ord(fill)
-        for x, y in line_iter_points(a, b, self.get_width_chars(), self.get_height_chars()):
-            self._buffer.try_set(x, y, fill)
+        for x1, y1, x2, y2 in line_iter_runs(a, b, self.get_width_chars(), self.get_height_chars()):
+            if y1 == y2:
+                self._buffer.fill_span(x1, x2, y1, fill)
+            else:
+                self._buffer.fill_column(x1, y1, y2, fill)
 
     # Draw a column of symbols
     def draw_column(self, x, y1, y2, fill="#"):
-        fill = ord(fill)
-        for y in range(y1, y2 + 1):
-            self._buffer.try_set(x, y, fill)
+        self._buffer.fill_column(x, y1, y2, ord(fill))
 
+    # Draw one column of a texture stretched between x1 and x2, from y1 down to y2
     def draw_sampler_column(self, x, x1, x2, y1, y2, sampler):
+        if not 0 <= x < self.get_width_chars():
+            return
         if x2 - x1 == 0:
             u = 0
         else:
@@ -152,21 +781,35 @@ class ConsoleGUI(Console):
         else:
             delta_y = y2 - y1
 
-        for y in range(y1, y2 + 1):
-            v = (y - y1) / delta_y
-            fill = sampler.sample(u, v)
-            if fill != ord(" "):
-                self._buffer.try_set(x, y, fill)
+        first = max(0, y1)
+        last = min(self.get_height_chars() - 1, y2)
+        if first > last:
+            return
+
+        sampler_x = max(0, min(sampler.get_width() - 1, round(u * sampler.get_width())))
+        runs = self.__column_cache.get((sampler, sampler_x, delta_y), delta_y + 1,
+                                       scale_column, sampler, sampler_x, delta_y)
+        if runs is not None:
+            # Each opaque run is copied straight into the buffer, cut down to the rows being drawn
+            for start, run in runs:
+                run_first = max(start, first - y1)
+                run_last = min(start + len(run), last - y1 + 1)
+                if run_first < run_last:
+                    self._buffer.write_column(x, y1 + run_first, run[run_first - start:run_last - start])
+            return
 
+        # Too big for the cache, so only the part on screen is sampled
+        column = sampler.sample_column(u, delta_y, first - y1, last - y1 + 1)
+        self._buffer.write_column_masked(x, first, column, SPACE_CHAR)
 
-    # Draw a triangle using barycentric coordinates
+    # Draw a triangle, one span of the buffer per row
     def draw_triangle(self, a, b, c, fill="#"):
         min_x, min_y, max_x, max_y = triangle_bbox(a, b, c)
         fill = ord(fill)
-        for x in range(min_x, max_x + 1):
-            for y in range(min_y, max_y + 1):
-                if triangle_contains(a, b, c, (x, y)):
-                    self._buffer.try_set(x, y, fill)
+        for y in range(max(0, min_y), min(self.get_height_chars() - 1, max_y) + 1):
+            span = triangle_row_span(a, b, c, y, min_x, max_x)
+            if span is not None:
+                self._buffer.fill_span(span[0], span[1], y, fill)
 
     # Draw a sampler triangle
     def draw_sampler(self, a, b, c, uv_a, uv_b, uv_c, sampler):
@@ -177,14 +820,27 @@ class ConsoleGUI(Console):
         min_y = max(0, min_y)
         max_x = min(width_chars - 1, max_x)
         max_y = min(height_chars - 1, max_y)
+
+        sampler_width = sampler.get_width()
+        sampler_height = sampler.get_height()
+        uv_o, uv_dx, uv_dy = triangle_uv_gradient(a, b, c, uv_a, uv_b, uv_c)
+        # Texture coordinates are stepped in fixed point across each row, so the inner loop has no floats
+        step_x = round(uv_dx[U] * sampler_width * FIXED_ONE)
+        step_y = round(uv_dx[V] * sampler_height * FIXED_ONE)
+
         # It is wasteful to calculate pixels that will not be visible, so they are clipped
-        for x in range(min_x, max_x + 1):
-            for y in range(min_y, max_y + 1):
-                if triangle_contains(a, b, c, (x, y)):
-                    u, v = triangle_uv(a, b, c, uv_a, uv_b, uv_c, (x, y))
-                    fill = sampler.sample(u, v)
-                    if fill != SPACE_CHAR:
-                        self._buffer.try_set(x, y, fill)
+        for y in range(min_y, max_y + 1):
+            span = triangle_row_span(a, b, c, y, min_x, max_x)
+            if span is None:
+                continue
+            x1, x2 = span
+            u = uv_o[U] + (x1 - a[X]) * uv_dx[U] + (y - a[Y]) * uv_dy[U]
+            v = uv_o[V] + (x1 - a[X]) * uv_dx[V] + (y - a[Y]) * uv_dy[V]
+            # Adding a half before flooring rounds to the nearest texture pixel, like Sampler.sample
+            texture_x = math.floor((u * sampler_width + 0.5) * FIXED_ONE)
+            texture_y = math.floor((v * sampler_height + 0.5) * FIXED_ONE)
+            row = sampler.sample_stepped(texture_x, texture_y, step_x, step_y, x2 - x1 + 1)
+            self._buffer.write_masked(x1, y, row, SPACE_CHAR)
 
     # Draw a single character to the screen
     def draw_character(self, a, fill="#"):
@@ -192,23 +848,11 @@ class ConsoleGUI(Console):
 
     # Draw text to the screen, with some options of where it should be drawn
     def draw_text(self, a, text, align_x=ALIGN_CENTER, align_y=ALIGN_CENTER, justify=ALIGN_CENTER):
-        lines = text.split("\n")
-        max_width = 0
-        max_height = len(lines)
-        for i in range(max_height):
-            len_line = len(lines[i])
-            if len_line > max_width:
-                max_width = len_line
-
-        for i in range(max_height):
-            # Pad the string depending on the justify option
-            # Spaces are NOT used to pad, as then it cannot be distinguished from actual spaces in the string
-            if justify == ALIGN_LEFT:
-                lines[i] = lines[i].ljust(max_width, "\0")
-            elif justify == ALIGN_RIGHT:
-                lines[i] = lines[i].rjust(max_width, "\0")
-            elif justify == ALIGN_CENTER:
-                lines[i] = lines[i].center(max_width, "\0")
+        # The same text is usually drawn every frame, so it is only laid out the first time
+        layout = self.__text_cache.get((text, justify), len(text) + 1, layout_text, text, justify)
+        if layout is None:
+            layout = layout_text(text, justify)
+        max_width, max_height, rows = layout
 
         mod_x = a[X]
         mod_y = a[Y]
@@ -224,59 +868,72 @@ class ConsoleGUI(Console):
         elif align_y == ALIGN_CENTER:
             mod_y = a[Y] - max_height // 2
 
-        # Draw character by character, line by line
+        # Draw line by line, each run of characters is written with one slice
         for y in range(max_height):
-            for x in range(max_width):
-                draw_x = x + mod_x
-                draw_y = y + mod_y
-                draw_c = lines[y][x]
-                if draw_c != "\0":
-                    self._buffer.try_set(draw_x, draw_y, ord(draw_c))
+            for x, run in rows[y]:
+                self._buffer.write(mod_x + x, mod_y + y, run)
 
     # Draw a sprite, essentially a non-rotating texture
     def draw_sprite(self, a, b, sampler):
         width = b[X] - a[X]
         height = b[Y] - a[Y]
-        if width == 0 or height == 0:
+        if width <= 0 or height <= 0:
             return
 
-        # Saves processing power, do not need to check if point lies within a triangle etc.
-        for y in range(height + 1):
-            v = y / height
-            for x in range(width + 1):
-                u = x / width
-                fill = sampler.sample(u, v)
-                if fill != SPACE_CHAR:
-                    self._buffer.try_set(x + a[X], y + a[Y], fill)
+        # Only the rows of the sprite on screen are drawn
+        first_y = max(0, -a[Y])
+        last_y = min(height, self.get_height_chars() - 1 - a[Y])
+        if first_y > last_y or a[X] >= self.get_width_chars() or b[X] < 0:
+            return
+
+        sprite = self.__sprite_cache.get((sampler, width, height), (width + 1) * (height + 1),
+                                         scale_sprite, sampler, width, height)
+        if sprite is None:
+            self.__draw_sprite_uncached(a, width, height, first_y, last_y, sampler)
+            return
+        # Each opaque run is copied straight into the buffer
+        for y in range(first_y, last_y + 1):
+            for x, run in sprite[y]:
+                self._buffer.write(a[X] + x, a[Y] + y, run)
+
+    # Draw a sprite too big for the cache, sampling only the part that is on screen
+    def __draw_sprite_uncached(self, a, width, height, first_y, last_y, sampler):
+        first_x = max(0, -a[X])
+        last_x = min(width, self.get_width_chars() - 1 - a[X])
+        for y in range(first_y, last_y + 1):
+            row = sampler.sample_row(y / height, width, first_x, last_x + 1)
+            self._buffer.write_masked(a[X] + first_x, a[Y] + y, row, SPACE_CHAR)
 
     # Draw a rectangle
     def draw_rectangle(self, a, b, fill="#"):
-        width = b[X] - a[X]
-        height = b[Y] - a[Y]
-        fill = ord(fill)
-        for y in range(height + 1):
-            for x in range(width + 1):
-                self._buffer.try_set(x + a[X], y + a[Y], fill)
+        self._buffer.fill_rectangle(a[X], a[Y], b[X], b[Y], ord(fill))
 
     # Draw a circle
     def draw_circle(self, a, b, fill="#"):
         width = b[X] - a[X]
         height = b[Y] - a[Y]
 
-        if width == 0 or height == 0:
+        # Nothing is drawn if the corners are the wrong way round
+        if width <= 0 or height <= 0:
             return
 
         fill = ord(fill)
         for y in range(height + 1):
-            for x in range(width + 1):
-                u = x / width * 2 - 1
-                v = y / height * 2 - 1
-                if (u * u) + (v * v) <= 1:
-                    # If distance from centre to point is within the radius of the circle
-                    self._buffer.try_set(x + a[X], y + a[Y], fill)
-
-    # 'Swap buffers' actually just prints the buffer to the screen, and clears the buffer for writing
-    # The name is borrowed from 3D graphics APIs such as OpenGL and DirectX
-    def swap_buffers(self):
-        self.stdout_w(self._buffer.as_string())
-        self._buffer.swap()
+            v = y / height * 2 - 1
+            v_squared = v * v
+            if v_squared > 1:
+                continue
+            # Solve for the first and last x on this row that are within the radius of the circle
+            half_span = math.sqrt(1 - v_squared) * width / 2
+            x1 = math.ceil(width / 2 - half_span)
+            x2 = math.floor(width / 2 + half_span)
+            # Rounding errors can put the ends one cell out, so check them against the exact test
+            if circle_contains(x1 - 1, width, v_squared):
+                x1 -= 1
+            elif not circle_contains(x1, width, v_squared):
+                x1 += 1
+            if circle_contains(x2 + 1, width, v_squared):
+                x2 += 1
+            elif not circle_contains(x2, width, v_squared):
+                x2 -= 1
+            self._buffer.fill_span(x1 + a[X], x2 + a[X], y + a[Y], fill)
@@ -0,0 +1,305 @@
+import os
+import sys
+import time
+import select
+# termios and tty only exist on unix-like systems, so the terminal output cannot be used on windows
+import termios
+import tty
+
+from render import Renderer
+from client import GameClient
+
+# Size of a terminal cell in pixels, only the ratio matters as it is used for aspect ratios
+TERMINAL_FONT_WIDTH  = 1
+TERMINAL_FONT_HEIGHT = 2
+
+# Changed characters closer together than this are sent as one run, as moving the cursor costs about as many bytes
+TERMINAL_RUN_GAP = 8
+
+# Terminals do not report key releases, so a key is released once it stops repeating
+# The first repeat takes longer to arrive than the rest
+KEY_REPEAT_DELAY    = 0.55
+KEY_REPEAT_INTERVAL = 0.1
+
+# ANSI escape sequences
+CSI = "\x1b["
+ENTER_ALTERNATE_SCREEN = CSI + "?1049h"
+LEAVE_ALTERNATE_SCREEN = CSI + "?1049l"
+HIDE_CURSOR = CSI + "?25l"
+SHOW_CURSOR = CSI + "?25h"
+CLEAR_SCREEN = CSI + "2J"
+CLEAR_LINE = CSI + "2K"
+RESET_COLOUR = CSI + "0m"
+
+# Escape sequences sent by the arrow keys, and the tkinter keysyms they stand for
+ARROW_KEYS = {
+    CSI + "A": "Up",
+    CSI + "B": "Down",
+    CSI + "C": "Right",
+    CSI + "D": "Left",
+    "\x1bOA": "Up",
+    "\x1bOB": "Down",
+    "\x1bOC": "Right",
+    "\x1bOD": "Left"
+}
+
+INTERRUPT_KEY = "\x03"
+RETURN_KEYS = ("\r", "\n")
+BACKSPACE_KEYS = ("\x7f", "\x08")
+
+# Move the cursor to a position, the terminal counts from 1
+def cursor_to(x, y):
+    return f"{CSI}{y + 1};{x + 1}H"
+
+# Create the escape sequence for a text or background colour, from a 6 digit hex string
+def colour_escape(colour, background=False):
+    r, g, b = int(colour[0:2], 16), int(colour[2:4], 16), int(colour[4:6], 16)
+    return f"{CSI}{48 if background else 38};2;{r};{g};{b}m"
+
+# Find the runs of characters that differ between two rows of the same length, as (start, end) pairs
+# Runs separated by less than the gap are joined, as one longer run is cheaper than moving the cursor
+def row_runs(old, new, gap=TERMINAL_RUN_GAP):
+    runs = []
+    start = None
+    end = None
+    for x in range(len(new)):
+        if old[x] != new[x]:
+            if start is None:
+                start = x
+            elif x - end > gap:
+                runs.append((start, end))
+                start = x
+            end = x
+    if start is not None:
+        runs.append((start, end))
+    return runs
+
+# A stand-in for a tkinter key event, only the keysym is used
+class KeyEvent:
+    def __init__(self, keysym):
+        self.keysym = keysym
+
+# A renderer that draws straight to the terminal using ANSI escape sequences
+# Only the characters that have changed since the last frame are sent
+# It has the same loop and events as a window, so the game client can be used with it
+class TerminalGUI(Renderer):
+    # Initialise the terminal, the bottom line is kept for typing commands
+    def __init__(self, text_colour="22BB00", background_colour="000000"):
+        self.__columns, self.__lines = os.get_terminal_size()
+        Renderer.__init__(self, self.get_width_chars(), self.get_height_chars())
+        self.__rows = None
+        self.__text_colour = text_colour
+        self.__background_colour = background_colour
+        self.__running = False
+        self.__saved_attributes = None
+        self.__held_keys = {}
+        self.__input = ""
+        self.__inputting = False
+        self.__input_changed = True
+        self.prev_input = ""
+
+    # Get the width, in characters, of the output
+    def get_width_chars(self):
+        return self.__columns
+
+    # Get the height, in characters, of the output
+    def get_height_chars(self):
+        return self.__lines - 1
+
+    # Get the width, in pixels, of the output
+    def get_width(self):
+        return self.__columns * TERMINAL_FONT_WIDTH
+
+    # Get the height, in pixels, of the output
+    def get_height(self):
+        return (self.__lines - 1) * TERMINAL_FONT_HEIGHT
+
+    # Set the text colour of the terminal, everything is redrawn in the new colour
+    def set_text_colour(self, colour):
+        self.__text_colour = colour
+        self.__rows = None
+
+    # Set the background colour of the terminal, everything is redrawn in the new colour
+    def set_background_colour(self, colour):
+        self.__background_colour = colour
+        self.__rows = None
+
+    # Write to the terminal all at once
+    def __write(self, output):
+        sys.stdout.write(output)
+        sys.stdout.flush()
+
+    # Check if the terminal has changed size, and resize the buffer if it has
+    def __check_size(self):
+        columns, lines = os.get_terminal_size()
+        if (columns, lines) != (self.__columns, self.__lines):
+            self.__columns = columns
+            self.__lines = lines
+            self._buffer.resize(self.get_width_chars(), self.get_height_chars())
+            self.__rows = None
+            self.__input_changed = True
+
+    # Send the changes between the last frame and this one, and clear the buffer for writing
+    def swap_buffers(self):
+        output = []
+        if self.__rows is None:
+            # Nothing on screen can be trusted, so redraw all of it
+            output.append(colour_escape(self.__text_colour) +
+                          colour_escape(self.__background_colour, background=True) + CLEAR_SCREEN)
+            self._buffer.changed_rows()
+            self.__rows = self._buffer.as_string().split("\n")[:-1]
+            for y in range(len(self.__rows)):
+                output.append(cursor_to(0, y) + self.__rows[y])
+            self.__input_changed = True
+        else:
+            for y, row in self._buffer.changed_rows():
+                old_row = self.__rows[y]
+                for start, end in row_runs(old_row, row):
+                    output.append(cursor_to(start, y) + row[start:end + 1])
+                self.__rows[y] = row
+
+        if len(output) > 0:
+            self.__write("".join(output))
+        self._buffer.swap()
+
+    # Redraw the line being typed on, if it has changed
+    # This is separate from the frame, as frames are not always drawn
+    def __draw_input(self):
+        if self.__input_changed:
+            self.__write(cursor_to(0, self.get_height_chars()) + CLEAR_LINE +
+                         ("> " + self.__input)[:self.get_width_chars() - 1])
+            self.__input_changed = False
+
+    # Read any keys that have been pressed since the last frame, without waiting
+    def __read_keys(self):
+        fd = sys.stdin.fileno()
+        keys = ""
+        while select.select([fd], [], [], 0)[0]:
+            data = os.read(fd, 1024)
+            if len(data) == 0:
+                break
+            keys += data.decode("utf-8", errors="ignore")
+        return keys
+
+    # Handle the keys pressed since the last frame, turning them into the same events a window would create
+    def __process_input(self):
+        now = time.perf_counter()
+        keys = self.__read_keys()
+        i = 0
+        while i < len(keys):
+            key = keys[i]
+            arrow = keys[i:i + 3]
+            if arrow in ARROW_KEYS:
+                self.__press_key(ARROW_KEYS[arrow], now)
+                i += 3
+                continue
+            if key == INTERRUPT_KEY:
+                self.end()
+                return
+            if key in RETURN_KEYS:
+                self.prev_input = self.__input
+                self.__input = ""
+                self.return_event()
+            elif key in BACKSPACE_KEYS:
+                self.__input = self.__input[:-1]
+            elif key.isprintable():
+                self.__input += key
+            else:
+                # Ignore other control keys and escape sequences
+                i += 1
+                continue
+            self.__input_changed = True
+            self.__update_inputting()
+            i += 1
+
+        # Any key that has stopped repeating has been released
+        for keysym, (press_time, repeated) in list(self.__held_keys.items()):
+            timeout = KEY_REPEAT_INTERVAL if repeated else KEY_REPEAT_DELAY
+            if now - press_time > timeout:
+                del self.__held_keys[keysym]
+                self.key_release_event(KeyEvent(keysym))
+
+    # Press a key, or keep it held if it is repeating
+    def __press_key(self, keysym, now):
+        if keysym in self.__held_keys:
+            self.__held_keys[keysym] = (now, True)
+        else:
+            self.__held_keys[keysym] = (now, False)
+            self.key_press_event(KeyEvent(keysym))
+
+    # Check if typing has started or stopped
+    def __update_inputting(self):
+        if self.__input != "":
+            if not self.__inputting:
+                self.input_begin_event()
+                self.__inputting = True
+        else:
+            if self.__inputting:
+                self.input_end_event()
+                self.__inputting = False
+
+    # Starts the main loop, taking over the terminal until it ends
+    def begin(self):
+        fd = sys.stdin.fileno()
+        self.__saved_attributes = termios.tcgetattr(fd)
+        tty.setraw(fd)
+        self.__write(ENTER_ALTERNATE_SCREEN + HIDE_CURSOR)
+        try:
+            self.on_begin()
+            self.__running = True
+            while self.__running:
+                self.__check_size()
+                self.__process_input()
+                if self.__running:
+                    self.main()
+                    self.__draw_input()
+        finally:
+            self.__write(RESET_COLOUR + SHOW_CURSOR + LEAVE_ALTERNATE_SCREEN)
+            termios.tcsetattr(fd, termios.TCSADRAIN, self.__saved_attributes)
+
+    # Ends the main loop
+    def end(self):
+        self.__running = False
+        self.on_end()
+
+    # Overrideable method for when the loop begins
+    def on_begin(self):
+        pass
+
+    # Overrideable method for when the loop ends
+    def on_end(self):
+        pass
+
+    # Overrideable method, called every frame
+    def main(self):
+        pass
+
+    # Overrideable method for key presses
+    def key_press_event(self, event):
+        pass
+
+    # Overrideable method for key releases
+    def key_release_event(self, event):
+        pass
+
+    # Overrideable method for when typing begins
+    def input_begin_event(self):
+        pass
+
+    # Overrideable method for when typing ends
+    def input_end_event(self):
+        pass
+
+    # Overrideable method for when the return key is pressed
+    def return_event(self):
+        pass
+
+# The game client displayed in the terminal
+class TerminalMain(GameClient, TerminalGUI):
+    def __init__(self):
+        TerminalGUI.__init__(self)
+        GameClient.__init__(self)
+
+if __name__ == "__main__":
+    main_game = TerminalMain()
+    main_game.begin()
@@ -0,0 +1,875 @@
+import math
+import time
+
+import util
+from util import Message
+from render import Renderer, ALIGN_LEFT, ALIGN_CENTER, ALIGN_TOP, ALIGN_RIGHT, Sampler, sampler_array
+from geometry import X, Y, Z, HALF_PI, point_rotate, point_transform, point_add, line_gradient, line_solve_y, \
+    line_clip, line_clip_to_screen, vector_dot, vector_perpendicular, vector_normalise, vector_from_points, vector_multiply
+from game import DisplayEntity, PlayerData, ProgressBar
+from mesh import WallMesh, solve_columns
+from camera import Camera
+from raycast import LevelGrid
+import batch
+from physics import get_by_id, GameState, ENGINE_MESH, ENGINE_RAYCAST
+
+MAINMENU_ICON_RATIO = 4.72
+MAINMENU_TEXT_DEPTH = 0.333
+MAINMENU_MAX_DEPTH  = 0.922
+
+CROSSHAIR_SIZE = 0.02
+
+GUI_MIN = 0.06
+GUI_MAX = 0.12
+GUI_RAISED_WIDTH = 0.33
+GUI_HEALTH_WIDTH = 0.25
+
+# The game view, keeps track of everything the physics thread has told it about, and draws it each frame
+# It only needs a renderer, so the same drawing code works in a window or without one
+class GameView(Renderer):
+    # Initialise the game view, the renderer itself is initialised by whichever output is used
+    def __init__(self):
+        self.__prev_delta_time = time.perf_counter()
+        self.__delta = 1
+
+        self.__main_menu_sampler = Sampler("res/textures/mainmenu.tex")
+        self.__main_menu_icons = sampler_array("res/textures/mainmenu_icons")
+        self.__main_menu_num_icons = len(self.__main_menu_icons)
+
+        self.__easter_egg_sampler = Sampler("res/textures/me.tex")
+
+        self.__game_state = GameState.MAIN_MENU
+        self.__settings = {
+            "MAIN_MENU_SELECTOR": 0,
+            "DISPLAY_INFO": False,
+            "TIME_REMAINING": 0,
+            "COLLECTED_GOLD": 0,
+            "DISPLAY_FPS": False,
+            "TEXT_COLOUR": "22BB00",
+            "BACKGROUND_COLOUR": "000000",
+            "FONT_SIZE": 10,
+            "FPS_CAP": 60,
+            "EASTER_EGG": False,
+            "FOV": math.pi / 2,
+            "NEAR_CLIP": 0.01,
+            "FAR_CLIP": 50,
+            "WALL_TOP": 2,
+            "WALL_BOTTOM": -2,
+            "CAMERA_HEIGHT": 0,
+            "BATCH_VERTICES": True,
+            "CULL_WALLS": True,
+            "CULL_BACK_FACES": False,
+            "RENDER_ENGINE": ENGINE_MESH
+        }
+        self.__level = None
+        self.__wall_mesh = None
+        self.__camera = Camera()
+        self.__level_grid = None
+        # How many walls were culled, thrown away when clipping, and drawn in the last frame
+        self.__wall_counts = (0, 0, 0)
+        self.__player_data = PlayerData(0, 0, 0, "")
+        self.__health_bar = ProgressBar((0, 0), GUI_HEALTH_WIDTH)
+        self.__entity_list = []
+        self.__menu_list = []
+        self.__text_box_list = []
+        self.__progress_bar_list = []
+        self.__focus_id = 0
+
+        # Keep track of whether the last frame drawn is still what should be on screen
+        self.__frame_dirty = True
+        self.__interpolating = False
+        self.__frame_size = None
+
+    # Update settings and make any necessary changes to the window
+    def update_settings(self, key, value):
+        if key == "TEXT_COLOUR":
+            self.set_text_colour(value)
+        if key == "BACKGROUND_COLOUR":
+            self.set_background_colour(value)
+        if key == "FONT_SIZE":
+            self.set_font_size(value)
+        self.__settings[key] = value
+        if key in ("FOV", "NEAR_CLIP", "FAR_CLIP"):
+            self.__camera.invalidate()
+        if key in ("WALL_TOP", "WALL_BOTTOM") and self.__level is not None:
+            self.__wall_mesh = self.__create_wall_mesh(self.__level)
+
+    # Create the mesh of a level's walls, using the current wall heights
+    def __create_wall_mesh(self, level):
+        return WallMesh(level, self.__settings["WALL_BOTTOM"], self.__settings["WALL_TOP"])
+
+    # Check if a message will change what is drawn
+    # Most messages are sent every physics step, even if nothing has changed
+    def __message_changes_frame(self, message, data):
+        if message == Message.ENTITY_UPDATE or message == Message.DELTA:
+            # Entities only move once a step has finished, which is checked when it happens
+            return False
+        elif message == Message.ENTITY_ANIMATE:
+            entity_id, sampler_index = data
+            entity = get_by_id(entity_id, self.__entity_list)
+            return entity is None or entity.get_sampler_index() != sampler_index
+        elif message in (Message.ENTITY_VISIBLE, Message.MENU_VISIBLE,
+                         Message.TEXT_BOX_VISIBLE, Message.PROGRESS_BAR_VISIBLE):
+            object_lists = {
+                Message.ENTITY_VISIBLE: self.__entity_list,
+                Message.MENU_VISIBLE: self.__menu_list,
+                Message.TEXT_BOX_VISIBLE: self.__text_box_list,
+                Message.PROGRESS_BAR_VISIBLE: self.__progress_bar_list
+            }
+            object_id, visible = data
+            shown_object = get_by_id(object_id, object_lists[message])
+            return shown_object is None or shown_object.get_visible() != visible
+        elif message == Message.MENU_CHANGE_INDEX:
+            menu_id, index = data
+            menu = get_by_id(menu_id, self.__menu_list)
+            return menu is None or menu.get_active_index() != index
+        elif message == Message.FOCUS_ID:
+            return self.__focus_id != data
+        elif message == Message.GAME_STATE_CHANGED:
+            return self.__game_state != data
+        elif message == Message.UPDATE_SETTING:
+            key, value = data
+            return key not in self.__settings or self.__settings[key] != value
+        elif message == Message.UPDATE_PLAYER_DATA:
+            player_data = self.__player_data
+            return data != (player_data.get_time_remaining(), player_data.get_gold_collected(),
+                            player_data.get_health(), player_data.get_held_item())
+        elif message == Message.PROGRESS_BAR_UPDATE:
+            progress_bar_id, position, progress = data
+            progress_bar = get_by_id(progress_bar_id, self.__progress_bar_list)
+            return (progress_bar is None or progress_bar.get_position() != position or
+                    progress_bar.get_progress() != progress)
+        return True
+
+    # Get the current value of a setting
+    def get_setting(self, key):
+        return self.__settings[key]
+
+    # Handle a message sent by the physics thread
+    def handle_message(self, message, data):
+        if self.__message_changes_frame(message, data):
+            self.__frame_dirty = True
+
+        if message == Message.LEVEL_CHANGED:
+            self.__level = data
+            # The walls never move, so are only built once for each level
+            self.__wall_mesh = self.__create_wall_mesh(data)
+        elif message == Message.ENTITY_CREATED:
+            self.__entity_list.append(data)
+        elif message == Message.ENTITY_UPDATE:
+            entity_id, position, rotation = data
+            entity = get_by_id(entity_id, self.__entity_list)
+            entity.set_position(position)
+            entity.set_rotation(rotation)
+        elif message == Message.ENTITY_ANIMATE:
+            entity_id, sampler_index = data
+            entity = get_by_id(entity_id, self.__entity_list)
+            entity.set_sampler_index(sampler_index)
+        elif message == Message.ENTITY_VISIBLE:
+            entity_id, visible = data
+            entity = get_by_id(entity_id, self.__entity_list)
+            entity.set_visible(visible)
+        elif message == Message.ENTITY_KILL:
+            for entity in self.__entity_list:
+                if entity.get_id() == data:
+                    self.__entity_list.remove(entity)
+                    break
+        elif message == Message.FOCUS_ID:
+            self.__focus_id = data
+        elif message == Message.DELTA:
+            self.__prev_delta_time = time.perf_counter()
+            self.__delta = data
+            # If the last step was still being drawn, it needs to be finished at the new positions
+            if self.__interpolating:
+                self.__frame_dirty = True
+                self.__interpolating = False
+            for entity in self.__entity_list:
+                entity.update()
+                # Anything that moved is drawn in between this step and the next
+                if entity.is_moving():
+                    self.__interpolating = True
+        elif message == Message.MENU_CREATED:
+            self.__menu_list.append(data)
+        elif message == Message.MENU_ADD_ITEM:
+            menu_id, item = data
+            menu = get_by_id(menu_id, self.__menu_list)
+            menu.add_item(*item)
+        elif message == Message.MENU_REMOVE_ITEM:
+            menu_id, index = data
+            menu = get_by_id(menu_id, self.__menu_list)
+            menu.remove_item(index)
+        elif message == Message.MENU_CHANGE_INDEX:
+            menu_id, index = data
+            menu = get_by_id(menu_id, self.__menu_list)
+            menu.set_active_index(index)
+        elif message == Message.MENU_VISIBLE:
+            menu_id, visible = data
+            menu = get_by_id(menu_id, self.__menu_list)
+            menu.set_visible(visible)
+        elif message == Message.MENU_SET_FORMATTING:
+            menu_id, format_index, formatting = data
+            menu = get_by_id(menu_id, self.__menu_list)
+            menu.set_formatting(format_index, formatting)
+        elif message == Message.TEXT_BOX_CREATED:
+            self.__text_box_list.append(data)
+        elif message == Message.TEXT_BOX_VISIBLE:
+            text_box_id, visible = data
+            text_box = get_by_id(text_box_id, self.__text_box_list)
+            text_box.set_visible(visible)
+        elif message == Message.TEXT_BOX_DELETED:
+            for text_box in self.__text_box_list:
+                if text_box.get_id() == data:
+                    self.__text_box_list.remove(text_box)
+        elif message == Message.GAME_STATE_CHANGED:
+            # Layers from the last game state are unlikely to be needed again
+            if self.__game_state != data:
+                self.clear_layers()
+            self.__game_state = data
+        elif message == Message.UPDATE_SETTING:
+            key, value = data
+            self.update_settings(key, value)
+        elif message == Message.PROGRESS_BAR_CREATED:
+            self.__progress_bar_list.append(data)
+        elif message == Message.PROGRESS_BAR_UPDATE:
+            progress_bar_id, position, progress = data
+            progress_bar = get_by_id(progress_bar_id, self.__progress_bar_list)
+            progress_bar.set_position(position)
+            progress_bar.set_progress(progress)
+        elif message == Message.PROGRESS_BAR_VISIBLE:
+            progress_bar_id, visible = data
+            progress_bar = get_by_id(progress_bar_id, self.__progress_bar_list)
+            progress_bar.set_visible(visible)
+        elif message == Message.UPDATE_PLAYER_DATA:
+            time_remaining, gold_collected, health, held_item = data
+            self.__player_data.set_time_remaining(time_remaining)
+            self.__player_data.set_gold_collected(gold_collected)
+            self.__player_data.set_health(health)
+            self.__player_data.set_held_item(held_item)
+
+    # Get how far between the previous and current physics states the screen is, from 0 to 1
+    # Allows to interpolate between physics states if screen FPS is higher than physics refresh rate
+    def get_alpha(self, cur_time):
+        curr_delta = cur_time - self.__prev_delta_time
+        alpha = curr_delta / self.__delta
+        return max(0, min(1, alpha))
+
+    # Check if the frame needs to be drawn again, because something has changed since it was last drawn
+    # While anything is moving, every frame is different until the end of the physics step is reached
+    def is_frame_dirty(self):
+        frame_size = self.get_width_chars(), self.get_height_chars(), self.get_width(), self.get_height()
+        if frame_size != self.__frame_size:
+            return True
+        if self.__interpolating:
+            return True
+        return self.__frame_dirty
+
+    # Force the next frame to be drawn, even if nothing seems to have changed
+    def mark_frame_dirty(self):
+        self.__frame_dirty = True
+
+    # Draw everything that is visible in the current game state
+    def draw_frame(self, alpha, fps):
+        self.__frame_dirty = False
+        self.__frame_size = self.get_width_chars(), self.get_height_chars(), self.get_width(), self.get_height()
+        # Once the end of the physics step is drawn, the entities are where they will stay until the next one
+        if alpha >= 1:
+            self.__interpolating = False
+
+        # The camera will be focused on the focus entity
+        focus_entity = get_by_id(self.__focus_id, self.__entity_list)
+        if focus_entity is not None:
+            focus_centre = focus_entity.get_position(alpha)
+            focus_rotation = focus_entity.get_rotation(alpha)
+        else:
+            focus_centre = (0, 0)
+            focus_rotation = 0
+        if self.__game_state == GameState.MAIN_MENU:
+            self.draw_main_menu()
+        elif self.__game_state == GameState.GAME:
+            fov          = self.__settings["FOV"]
+            near_clip    = self.__settings["NEAR_CLIP"]
+            far_clip     = self.__settings["FAR_CLIP"]
+            aspect_ratio = self.get_width_chars() / self.get_height_chars()
+
+            z_buffer = [far_clip for _ in range(self.get_width_chars() + 1)]
+
+            # The camera only builds its matrix again if it has moved or the projection has changed
+            self.__camera.set_view(focus_centre, focus_rotation)
+            self.__camera.set_projection(fov, aspect_ratio, near_clip, far_clip)
+
+            if self.__level is not None:
+                #self.draw_level(self.__level, focus_centre, focus_rotation)
+                self.draw_3d_level(self.__wall_mesh, self.__camera, z_buffer)
+
+            for entity in self.__entity_list:
+                if entity.get_id() != self.__focus_id and entity.get_visible():
+                    self.draw_3d_entity(entity, focus_centre, alpha, self.__camera, z_buffer)
+
+            # The crosshair only changes if the screen does
+            self.draw_layer(self.draw_crosshair)
+            self.draw_game_gui()
+
+        for progress_bar in self.__progress_bar_list:
+            if progress_bar.get_visible():
+                self.draw_progress_bar(progress_bar, focus_centre, focus_rotation)
+
+        for menu in self.__menu_list:
+            if menu.get_visible():
+                self.draw_menu(menu)
+
+        # Text boxes never change, so each is drawn once into a layer
+        for text_box in self.__text_box_list:
+            if text_box.get_visible():
+                self.draw_layer(self.draw_text_box, text_box)
+
+        # Some optional stats to display in the top right
+        y = 0
+        width_chars = self.get_width_chars() - 1
+        if self.__settings["DISPLAY_FPS"]:
+            self.draw_text((width_chars, y), f"FPS: {round(fps)}",
+                           align_x=ALIGN_RIGHT, align_y=ALIGN_TOP, justify=ALIGN_RIGHT)
+            y += 1
+            for line in self.get_stats_lines():
+                self.draw_text((width_chars, y), line, align_x=ALIGN_RIGHT, align_y=ALIGN_TOP, justify=ALIGN_RIGHT)
+                y += 1
+
+    # Get the lines of the stats display, describing how the renderer is performing
+    def get_stats_lines(self):
+        sampler_count, sampler_time = Sampler.get_load_stats()
+        sprite_cache = self.get_sprite_cache()
+        column_cache = self.get_column_cache()
+        text_cache = self.get_text_cache()
+        return [f"TEXTURES: {sampler_count} IN {sampler_time * 1000:.1f}MS",
+                f"SPRITES: {sprite_cache.get_hits()} HIT {sprite_cache.get_misses()} MISS {len(sprite_cache)} HELD",
+                f"COLUMNS: {column_cache.get_hits()} HIT {column_cache.get_misses()} MISS {len(column_cache)} HELD",
+                f"TEXT: {text_cache.get_hits()} HIT {text_cache.get_misses()} MISS {len(text_cache)} HELD",
+                "WALLS: {2} VISIBLE {0} CULLED {1} CLIPPED".format(*self.__wall_counts)]
+
+    # Draw an entity to the screen
+    def draw_entity(self, entity, centre, rotation, alpha):
+        display_type = entity.get_display_type()
+        if display_type == DisplayEntity.SPRITE or display_type == DisplayEntity.TAGGED_SPRITE:
+            entity_centre = entity.get_position(alpha)
+            entity_size   = entity.get_size()
+            entity_tlr = point_rotate((entity_size, entity_size), rotation + math.pi)
+            entity_brr = point_rotate((entity_size, entity_size), rotation)
+            entity_tl = self.transform_point(point_add(entity_centre, entity_tlr), centre, rotation)
+            entity_br = self.transform_point(point_add(entity_centre, entity_brr), centre, rotation)
+            entity_sampler = entity.get_sampler()
+            self.draw_sprite(entity_tl, entity_br, entity_sampler)
+            if display_type == DisplayEntity.TAGGED_SPRITE:
+                entity_c = (entity_tl[X] + entity_br[X]) // 2, (entity_tl[Y] + entity_br[Y]) // 2
+                self.draw_text(entity_c, entity.get_display_name(),
+                               align_x=ALIGN_CENTER, align_y=ALIGN_CENTER, justify=ALIGN_CENTER)
+        elif display_type == DisplayEntity.TEXTURE:
+            entity_centre = entity.get_position(alpha)
+            entity_rotation = entity.get_rotation(alpha)
+            entity_size = entity.get_size()
+
+            # Grab the four corners of the image
+            entity_ar = point_rotate((entity_size, entity_size), entity_rotation + math.pi)
+            entity_br = point_rotate((entity_size, entity_size), entity_rotation - HALF_PI)
+            entity_cr = point_rotate((entity_size, entity_size), entity_rotation)
+            entity_dr = point_rotate((entity_size, entity_size), entity_rotation + HALF_PI)
+
+            entity_a = self.transform_point(point_add(entity_centre, entity_ar), centre, rotation)
+            entity_b = self.transform_point(point_add(entity_centre, entity_br), centre, rotation)
+            entity_c = self.transform_point(point_add(entity_centre, entity_cr), centre, rotation)
+            entity_d = self.transform_point(point_add(entity_centre, entity_dr), centre, rotation)
+
+            # the uv coordinates are for the image so:
+            #  (0, 0) ----- (1, 0)
+            #     |     \      |
+            #     |      \     |
+            #  (0, 1) ----- (1, 1)
+            # A rectangle made of two clockwise triangles
+            entity_sampler = entity.get_sampler()
+            self.draw_sampler(entity_a, entity_b, entity_c, (0, 0), (1, 0), (1, 1), entity_sampler)
+            self.draw_sampler(entity_a, entity_c, entity_d, (0, 0), (1, 1), (0, 1), entity_sampler)
+
+    # Draw a level to the screen
+    def draw_level(self, level, centre, rotation):
+        centred_bounds = []
+        for point in level.get_bounds():
+            point = self.transform_point(point, centre, rotation)
+            centred_bounds.append(point)
+
+        centred_texture_bounds = []
+        # For each point in the level, transform it to screen space
+        for point in level.get_texture_bounds():
+            point = self.transform_point(point, centre, rotation)
+            centred_texture_bounds.append(point)
+
+        outline = level.get_outline()
+        len_bounds = len(centred_bounds)
+
+        for i in range(level.get_num_textures()):
+            sampler_index, c1, c2, c3, c4 = level.get_texture(i)
+            if self.__settings["EASTER_EGG"]:
+                # The Easter egg xD
+                sampler = self.__easter_egg_sampler
+            else:
+                sampler = level.get_sampler(sampler_index)
+            a = centred_texture_bounds[c1]
+            b = centred_texture_bounds[c2]
+            c = centred_texture_bounds[c3]
+            d = centred_texture_bounds[c4]
+            #self.draw_sampler(a, b, c, (0, 0), (1, 0), (1, 1), sampler)
+            #self.draw_sampler(a, c, d, (0, 0), (1, 1), (0, 1), sampler)
+
+        exit_index = level.get_exit_index()
+        # Loop through each line
+        for i in range(len_bounds):
+            bound_a = centred_bounds[i]
+            if i == len_bounds - 1:
+                bound_b = centred_bounds[0]
+            else:
+                bound_b = centred_bounds[i + 1]
+
+            if i == exit_index:
+                # If is the exit line, don't draw it so it looks like you can go through
+                exit_centre = point_add(bound_a, bound_b)
+                exit_centre = exit_centre[X] // 2, exit_centre[Y] // 2
+                self.draw_text(exit_centre, "EXIT", align_x=ALIGN_CENTER, align_y=ALIGN_CENTER, justify=ALIGN_CENTER)
+            else:
+                outline="#"
+                self.draw_line(bound_a, bound_b, fill=outline)
+
+    # Draw the walls of a level in 3D, using the mesh built when the level was loaded
+    # The walls that could be seen are found either by culling the mesh or by casting rays, depending on the settings
+    def draw_3d_level(self, wall_mesh, camera, z_buffer):
+        camera_vector = vector_normalise((1, 3))
+
+        columns = self.__solve_mesh_columns(wall_mesh, camera, z_buffer)
+
+        for x, (top_y, bottom_y, i) in enumerate(columns):
+            if i == -1:
+                continue
+            normal = wall_mesh.get_normal(i)
+
+            diffuse = max(math.fabs(vector_dot(normal, camera_vector)), 0)
+
+            index = max(1, round(5 * diffuse))
+            if index < 10:
+                fill = " .-:=+*%#@"[index]
+            else:
+                fill = " "
+            self.draw_column(x, bottom_y, top_y, fill=fill)
+
+    # Find the wall to draw in each column by transforming, clipping and solving the walls of the mesh
+    def __solve_mesh_columns(self, wall_mesh, camera, z_buffer):
+        screen_width = self.get_width_chars()
+        screen_height = self.get_height_chars()
+
+        # Every wall is worked on at once with NumPy if it is available
+        # Clipping is only faster in batches once there are enough walls, but solving the columns always is
+        use_batch = self.__settings["BATCH_VERTICES"] and batch.is_available()
+        batch_walls = use_batch and wall_mesh.get_num_walls() >= batch.BATCH_MIN_WALLS
+
+        # Walls that clipping would throw away, and walls facing away from the camera if asked for, are culled first
+        # When raycasting, only the walls the rays reach are used instead
+        wall_indices = None
+        num_culled = 0
+        if self.__settings["RENDER_ENGINE"] == ENGINE_RAYCAST:
+            wall_indices = self.__cast_walls(wall_mesh.get_level(), camera)
+            num_culled = wall_mesh.get_num_walls() - len(wall_indices)
+        elif self.__settings["CULL_WALLS"]:
+            back_faces = self.__settings["CULL_BACK_FACES"]
+            if batch_walls:
+                wall_indices, num_culled = batch.cull_walls(wall_mesh, camera, back_faces)
+            else:
+                wall_indices, num_culled = wall_mesh.cull(camera, back_faces)
+
+        if batch_walls:
+            walls = batch.clip_walls(wall_mesh, camera.get_matrix(), screen_width, screen_height, wall_indices)
+        else:
+            walls = wall_mesh.clip(camera.get_matrix(), screen_width, screen_height, wall_indices)
+        num_clipped = wall_mesh.get_num_walls() - num_culled - len(walls)
+        self.__wall_counts = (num_culled, num_clipped, len(walls))
+        if use_batch:
+            return batch.solve_columns(walls, screen_width, screen_height, z_buffer)
+        return solve_columns(walls, screen_width, screen_height, z_buffer)
+
+    # Find the walls that could be seen by casting rays through a grid of the level
+    # The grid is built the first time it is needed for a level
+    def __cast_walls(self, level, camera):
+        if self.__level_grid is None or self.__level_grid.get_level() is not level:
+            self.__level_grid = LevelGrid(level)
+        return self.__level_grid.find_walls(camera, self.get_width_chars())
+
+    def draw_3d_entity(self, entity, centre, alpha, camera, z_buffer):
+        entity_centre  = entity.get_position(alpha)
+        entity_size    = entity.get_size()
+        if self.__settings["EASTER_EGG"]:
+            entity_sampler = self.__easter_egg_sampler
+        else:
+            entity_sampler = entity.get_sampler()
+
+        rotation_vector = vector_from_points(entity_centre, centre)
+        rotation_vector = vector_normalise(rotation_vector)
+        rotation_vector = vector_perpendicular(rotation_vector)
+
+        entity_l = vector_multiply(rotation_vector, entity_size)
+        entity_l = point_add(entity_centre, entity_l)
+
+        entity_r = vector_multiply(rotation_vector, -entity_size)
+        entity_r = point_add(entity_centre, entity_r)
+
+        entity_tl = (entity_l[X], entity_size, entity_l[Y])
+        entity_tl = camera.transform(entity_tl)
+
+        entity_tr = (entity_r[X], entity_size, entity_r[Y])
+        entity_tr = camera.transform(entity_tr)
+
+        entity_ml = (entity_l[X], 0, entity_l[Y])
+        entity_ml = camera.transform(entity_ml)
+
+        entity_mr = (entity_r[X], 0, entity_r[Y])
+        entity_mr = camera.transform(entity_mr)
+
+        entity_bl = (entity_l[X], -entity_size, entity_l[Y])
+        entity_bl = camera.transform(entity_bl)
+
+        entity_br = (entity_r[X], -entity_size, entity_r[Y])
+        entity_br = camera.transform(entity_br)
+
+        mid_line = line_clip(entity_ml, entity_mr)
+        if mid_line is None: return
+
+        top_line = line_clip(entity_tl, entity_tr)
+        bottom_line = line_clip(entity_bl, entity_br)
+
+        screen_width = self.get_width_chars()
+        screen_height = self.get_height_chars()
+
+        mid_line = line_clip_to_screen(*mid_line, screen_width, screen_height)
+
+        if top_line is None:
+            top_line_g = None
+        else:
+            top_line = line_clip_to_screen(*top_line, screen_width, screen_height)
+            top_line_g = line_gradient(*top_line)
+
+        if bottom_line is None:
+            bottom_line_g = None
+        else:
+            bottom_line = line_clip_to_screen(*bottom_line, screen_width, screen_height)
+            bottom_line_g = line_gradient(*bottom_line)
+
+        min_x = round(min(mid_line[0][X], mid_line[1][X]))
+        max_x = round(max(mid_line[0][X], mid_line[1][X]))
+
+        mid_line_g = line_gradient((mid_line[0][X], entity_ml[Z]), (mid_line[1][X], entity_mr[Z]))
+
+        for x in range(min_x, max_x + 1):
+            z = line_solve_y(x, *mid_line_g)
+
+            if z_buffer[x] < z:
+                continue
+
+            if top_line_g is None:
+                top_y = screen_height + 1
+            else:
+                top_y = round(line_solve_y(x, *top_line_g))
+
+            if bottom_line_g is None:
+                bottom_y = 0
+            else:
+                bottom_y = round(line_solve_y(x, *bottom_line_g))
+
+            self.draw_sampler_column(x, min_x, max_x, bottom_y, top_y, entity_sampler)
+
+    def draw_crosshair(self):
+        screen_width = self.get_width_chars()
+        screen_height = self.get_height_chars()
+
+        aspect_ratio = self.get_width() / self.get_height()
+
+        crosshair_size_x = round(screen_width * CROSSHAIR_SIZE / aspect_ratio)
+        crosshair_size_y = round(screen_height * CROSSHAIR_SIZE)
+
+        mid_x = screen_width // 2
+        mid_y = screen_height // 2
+        self.draw_rectangle((mid_x - crosshair_size_x, mid_y), (mid_x + crosshair_size_x, mid_y), fill="-")
+        self.draw_column(mid_x, mid_y - crosshair_size_y, mid_y + crosshair_size_y, fill="|")
+        self.draw_character((mid_x, mid_y), fill="+")
+
+    def draw_3d_line(self, a, b, fill="#"):
+        line = line_clip(a, b)
+        if line is not None:
+            a, b = line_clip_to_screen(*line, self.get_width_chars(), self.get_height_chars())
+            self.draw_line(a, b, fill=fill)
+
+    def draw_game_gui(self):
+        screen_width = self.get_width_chars()
+        screen_height = self.get_height_chars()
+
+        gui_min_y = round(screen_height * (1 - GUI_MIN))
+        gui_max_y = round(screen_height * (1 - GUI_MAX))
+
+        # The background of the gui only changes if the screen does
+        self.draw_layer(self.draw_game_gui_background)
+
+        self.__health_bar.set_position((screen_width // 2 - 1, (gui_min_y + gui_max_y) // 2 + 1))
+        self.__health_bar.set_progress(self.__player_data.get_health())
+        self.__health_bar.set_visible(True)
+        self.draw_progress_bar_raw(self.__health_bar)
+
+        text_height = (gui_min_y + screen_height) // 2
+
+        game_info = f"TIME LEFT: {self.__player_data.get_time_remaining()} | GOLD: {self.__player_data.get_gold_collected()}"
+        self.draw_text((1, text_height), game_info,
+                       align_x=ALIGN_LEFT, align_y=ALIGN_TOP, justify=ALIGN_LEFT)
+
+        player_info = f"HOLDING: {self.__player_data.get_held_item()}"
+        self.draw_text((screen_width - 1, text_height), player_info,
+                       align_x=ALIGN_RIGHT, align_y=ALIGN_TOP, justify=ALIGN_RIGHT)
+
+    # Draw the background of the gui at the bottom of the screen, the raised part in the middle has slanted edges
+    def draw_game_gui_background(self):
+        screen_width = self.get_width_chars()
+        screen_height = self.get_height_chars()
+
+        gui_min_y = round(screen_height * (1 - GUI_MIN))
+        gui_max_y = round(screen_height * (1 - GUI_MAX))
+
+        x_diff = screen_width * ((1 - GUI_RAISED_WIDTH) / 2)
+        gui_min_x = round(x_diff)
+        gui_max_x = round(screen_width - x_diff)
+
+        self.draw_rectangle((0, gui_min_y), (screen_width, screen_height), fill=" ")
+        self.draw_line((0, gui_min_y), (screen_width, gui_min_y), fill="_")
+        self.draw_rectangle((gui_min_x, gui_max_y), (gui_max_x, gui_min_y), fill=" ")
+        self.draw_line((gui_min_x, gui_max_y), (gui_max_x, gui_max_y), fill="_")
+
+        delta_y = gui_min_y - gui_max_y
+        for i in range(delta_y):
+            self.draw_column(gui_min_x - i, gui_max_y + i + 1, gui_min_y, fill=" ")
+            self.draw_column(gui_max_x + i, gui_max_y + i + 1, gui_min_y, fill=" ")
+            self.draw_character((gui_min_x - i, gui_max_y + i + 1), fill="/")
+            self.draw_character((gui_max_x + i, gui_max_y + i + 1), fill="\\")
+
+    # Draw a box to the screen
+    def draw_box(self, menu_tl, menu_br):
+        menu_tr = menu_br[X], menu_tl[Y]
+        menu_bl = menu_tl[X], menu_br[Y]
+
+        # Background
+        self.draw_rectangle(menu_tl, menu_br, fill=" ")
+
+        # Edges
+        self.draw_line(menu_tl, menu_tr, fill="-")
+        self.draw_line(menu_bl, menu_br, fill="-")
+        self.draw_line(menu_tl, menu_bl, fill="|")
+        self.draw_line(menu_tr, menu_br, fill="|")
+
+        # Corners
+        self.draw_character(menu_tl, fill="+")
+        self.draw_character(menu_tr, fill="+")
+        self.draw_character(menu_br, fill="+")
+        self.draw_character(menu_bl, fill="+")
+
+    # Draw a box with a title
+    def draw_title_box(self, menu_tl, menu_br, title):
+        menu_tr = menu_br[X], menu_tl[Y]
+        self.draw_box(menu_tl, menu_br)
+        self.draw_line((menu_tl[X], menu_tl[Y] + 2), (menu_tr[X], menu_tr[Y] + 2), fill="-")
+        self.draw_character((menu_tl[X], menu_tl[Y] + 2), fill="+")
+        self.draw_character((menu_tr[X], menu_tr[Y] + 2), fill="+")
+
+        title_pos = (menu_tl[X] + menu_br[X]) // 2, menu_tl[Y] + 1
+        self.draw_text(title_pos, title, align_x=ALIGN_CENTER, align_y=ALIGN_TOP, justify=ALIGN_CENTER)
+
+    # Draw a box with a title and some content
+    def draw_text_box(self, text_box):
+        width = self.get_width_chars()
+        height = self.get_height_chars()
+        box_width = text_box.get_max_width()
+        box_height = text_box.get_max_height()
+        max_width = round(width * box_width)
+        max_height = round(height * box_height)
+
+        # Wrap the text to the maximum width
+        if max_width > 4 and max_height > 6:
+            display = "\n".join(text_box.wrap_content(max_width - 4)[:max_height - 6])
+        else:
+            display = ""
+        text_width, text_height = util.find_string_size(display)
+
+        # Find the maximum size that the box needs to be or can be
+        if text_width > max_width - 4:
+            box_width = max_width
+        else:
+            box_width = text_width + 3
+
+        if text_height > max_height - 6:
+            box_height = max_height
+        else:
+            box_height = text_height + 5
+
+        # Draw the text box
+        if max_width > 0:
+            half_box_width = box_width / width * 0.5
+            half_box_height = box_height / height * 0.5
+            box_tl = round(width * (0.5 - half_box_width)), round(height * (0.5 - half_box_height))
+            box_br = round(box_tl[X] + box_width), round(box_tl[Y] + box_height)
+            self.draw_title_box(box_tl, box_br, text_box.get_title())
+            text_tl = box_tl[X] + 2, box_tl[Y] + 4
+            self.draw_text(text_tl, display, align_x=ALIGN_LEFT, align_y=ALIGN_TOP, justify=ALIGN_LEFT)
+
+    def __progress_bar_text(self, progress_bar):
+        width = round(self.get_width_chars() * progress_bar.get_width())
+        num_chars = width - 2
+        num_chars_filled = round(num_chars * progress_bar.get_progress())
+        num_chars_blank = num_chars - num_chars_filled
+        return "[" + "#" * num_chars_filled + " " * num_chars_blank + "]"
+
+    # Draw a progress bar
+    def draw_progress_bar(self, progress_bar, centre, rotation):
+        display = self.__progress_bar_text(progress_bar)
+        position = self.transform_point(progress_bar.get_position(), centre, rotation)
+        self.draw_text(position, display, align_x=ALIGN_CENTER, align_y=ALIGN_CENTER, justify=ALIGN_CENTER)
+
+    def draw_progress_bar_raw(self, progress_bar):
+        display = self.__progress_bar_text(progress_bar)
+        self.draw_text(progress_bar.get_position(), display, align_x=ALIGN_CENTER, align_y=ALIGN_CENTER, justify=ALIGN_CENTER)
+
+    # Draw a menu
+    def draw_menu(self, menu):
+        active_index = menu.get_active_index()
+        width = self.get_width_chars()
+        height = self.get_height_chars()
+        menu_tl = round(width * 0.1), round(height * 0.1)
+        menu_br = round(width * 0.9), round(height * 0.9)
+        menu_tr = menu_br[X], menu_tl[Y]
+
+        scroll_min_x = menu_tl[X] + 6
+        scroll_min_y = menu_tl[Y] + 4
+
+        # Depending on the width, the text box description either appears at the side or the bottom
+        if self.get_width() < self.get_height():
+            split_x = round(width * 0.66)
+            split_a = split_x, menu_tl[Y] + 2
+            split_b = split_x, menu_br[Y]
+            split_f = "|"
+            scroll_width = split_x - scroll_min_x - 1
+            scroll_height = menu_br[Y] - 1 - scroll_min_y
+            desc_width = menu_tr[X] - split_x - 3
+            desc_height = scroll_height
+        else:
+            split_y = round(height * 0.66)
+            split_a = menu_tl[X], split_y
+            split_b = menu_br[X], split_y
+            split_f = "-"
+            scroll_width = menu_br[X] - scroll_min_x - 1
+            scroll_height = split_y - 1 - scroll_min_y
+            desc_width = scroll_width
+            desc_height = menu_br[Y] - split_y - 3
+
+        # The frame of the menu only changes if the screen does
+        self.draw_layer(self.draw_menu_frame, menu_tl, menu_br, menu.get_title(), split_a, split_b, split_f)
+        self.draw_text((menu_tr[X] - 1, menu_tr[Y] + 1), text=f"{active_index + 1}/{menu.get_num_items()}",
+                       align_x=ALIGN_RIGHT, justify=ALIGN_RIGHT)
+
+        cur_y = scroll_min_y
+        if scroll_width > 0:
+            # Find out, once each menu item has been wrapped, how many lines will be taken up
+            wrapped_names, needed_lines = menu.wrap_item_names(scroll_width)
+
+            # Find out, if the selected item will not fit onto the screen, which item to start drawing at to fit it in
+            start_index = 0
+            if needed_lines[active_index] > scroll_height:
+                for i in range(len(needed_lines)):
+                    if needed_lines[active_index] - needed_lines[i] < scroll_height - 2:
+                        break
+                    start_index = i
+
+            # Draw each item name
+            for i in range(start_index, menu.get_num_items()):
+                wrapped = wrapped_names[i]
+                len_wrap = len(wrapped)
+                max_wrap = scroll_height - cur_y + scroll_min_y
+                if len_wrap < max_wrap:
+                    max_wrap = len_wrap
+                if max_wrap <= 0:
+                    break
+
+                self.draw_text((scroll_min_x, cur_y), text="\n".join(wrapped[:max_wrap]),
+                               align_x=ALIGN_LEFT, align_y=ALIGN_TOP, justify=ALIGN_LEFT)
+                if i == active_index:
+                    # If this item is selected, draw the selector arrow
+                    self.draw_text((scroll_min_x - 4, cur_y), text="-->")
+
+                cur_y += len_wrap + 1
+
+        # If the width is 0, textwrap will throw an exception
+        if desc_width > 0:
+            self.draw_text((split_a[X] + 2, split_a[Y] + 2),
+                           "\n".join(menu.wrap_item_description(active_index, desc_width)[:desc_height]),
+                            align_x=ALIGN_LEFT, align_y=ALIGN_TOP, justify=ALIGN_LEFT)
+
+    # Draw the box around a menu, with a line splitting the items from the description
+    def draw_menu_frame(self, menu_tl, menu_br, title, split_a, split_b, split_f):
+        self.draw_title_box(menu_tl, menu_br, title)
+        self.draw_line(split_a, split_b, fill=split_f)
+        self.draw_character(split_a, fill="+")
+        self.draw_character(split_b, fill="+")
+
+    # Draw the main menu screen
+    def draw_main_menu(self):
+        width = self.get_width()
+        width_chars = self.get_width_chars()
+        height = self.get_height()
+        height_chars = self.get_height_chars()
+        # Centre the background picture, depending on the aspect ratio
+        if self.get_width() > self.get_height():
+            ratio = height / width
+            offset = (width_chars - width_chars * ratio) * 0.5
+            bg_tl = round(offset), 0
+            bg_br = round(width_chars - offset), height_chars
+        else:
+            ratio = width / height
+            offset = (height_chars - height_chars * ratio) * 0.5
+            bg_tl = 0, round(offset)
+            bg_br = width_chars, round(height_chars - offset)
+        self.draw_sprite(bg_tl, bg_br, self.__main_menu_sampler)
+
+        background_height = bg_br[Y] - bg_tl[Y]
+        icons_start_y = bg_tl[Y] + background_height * MAINMENU_TEXT_DEPTH
+        icons_end_y = bg_tl[Y] + background_height * MAINMENU_MAX_DEPTH
+        icons_step_y = (icons_end_y - icons_start_y) * (1 / self.__main_menu_num_icons)
+        icons_width = round(icons_step_y * MAINMENU_ICON_RATIO)
+        icons_start_x = (self.get_width_chars() - icons_width) // 2
+        icons_curr_y = icons_start_y
+
+        box_tl = None
+        box_br = None
+
+        points = []
+
+        # Draw the main menu buttons
+        for i in range(self.__main_menu_num_icons):
+            point_a = icons_start_x, round(icons_curr_y)
+            point_b = icons_start_x + icons_width, round(icons_curr_y + icons_step_y)
+            points.append((point_a, point_b))
+            if i == self.__settings["MAIN_MENU_SELECTOR"]:
+                # Find where to highlight the selected button
+                box_tl = point_a[X] - 1, point_a[Y] - 1
+                box_br = point_b[X] + 1, point_b[Y]
+            icons_curr_y = round(icons_curr_y + icons_step_y)
+
+        if box_tl is not None and box_br is not None:
+            # The selector
+            self.draw_box(box_tl, box_br)
+
+        count = 0
+        for icon in self.__main_menu_icons:
+            self.draw_sprite(*points[count], icon)
+            count += 1
+
+    # Convert a point to screen space, depending on the size of the screen
+    def transform_point(self, point, centre, rotation):
+        return point_transform(point, centre, -rotation, 20.0,
+                               self.get_width(), self.get_height(),
+                               self.get_width_chars(), self.get_height_chars()
+                               )